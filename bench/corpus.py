@@ -0,0 +1,90 @@
+# Synthetic markdown corpus used by the benchmarks
+import argparse
+import os
+import random
+
+WORDS = ["the", "ring", "of", "power", "middle-earth", "hobbit", "shire", "elves", "dwarves", "journey"]
+SPANS = [
+    "**{}**",
+    "*{}*",
+    "`{}`",
+    "[{}](https://example.com/{})",
+    "[{}](/{})",
+    "![{}](/images/{}.png)",
+]
+# Relative weight of each block kind in a page
+DEFAULT_MIX = {"heading": 1, "paragraph": 6, "list": 2, "code": 1, "quote": 1}
+
+def parse_mix(text):
+    # "heading=1,paragraph=6" -> {"heading": 1, "paragraph": 6}
+    mix = {}
+    for pair in text.split(","):
+        (kind, weight) = pair.split("=")
+        if kind not in DEFAULT_MIX:
+            raise ValueError(f"unknown block kind: {kind}")
+        mix[kind] = int(weight)
+    return mix
+
+def make_paragraph(rng, words, span_rate = 0.1):
+    out = []
+    for _ in range(words):
+        word = rng.choice(WORDS)
+        if rng.random() < span_rate:
+            out.append(rng.choice(SPANS).format(word, word))
+        else:
+            out.append(word)
+    return " ".join(out)
+
+def make_block(rng, kind, words):
+    match kind:
+        case "heading":
+            return f"{'#' * rng.randint(2, 4)} {make_paragraph(rng, 5, 0)}"
+        case "paragraph":
+            return make_paragraph(rng, words)
+        case "list":
+            if rng.random() < 0.5:
+                return "\n".join(f"- {make_paragraph(rng, 8)}" for _ in range(rng.randint(3, 8)))
+            return "\n".join(f"{i}. {make_paragraph(rng, 8)}" for i in range(1, rng.randint(4, 9)))
+        case "code":
+            lines = [f"{rng.choice(WORDS)} = {rng.randint(0, 99)}" for _ in range(rng.randint(2, 6))]
+            return "```\n" + "\n".join(lines) + "\n```"
+        case "quote":
+            return "\n".join(f"> {make_paragraph(rng, 12)}" for _ in range(rng.randint(1, 3)))
+    raise ValueError(f"unknown block kind: {kind}")
+
+def make_document(rng, blocks, words = 60, mix = None):
+    mix = mix if mix != None else DEFAULT_MIX
+    kinds = list(mix)
+    weights = [mix[k] for k in kinds]
+    out = [f"# {make_paragraph(rng, 4, 0).title()}"]
+    for kind in rng.choices(kinds, weights, k=blocks):
+        out.append(make_block(rng, kind, words))
+    return "\n\n".join(out) + "\n"
+
+def generate_corpus(root, pages, blocks = 50, words = 60, mix = None, seed = 0):
+    # Writes pages as <root>/section-N/page-M/index.md, 100 pages per section
+    rng = random.Random(seed)
+    paths = []
+    for i in range(pages):
+        page_dir = os.path.join(root, f"section-{i // 100}", f"page-{i}")
+        os.makedirs(page_dir, exist_ok=True)
+        path = os.path.join(page_dir, "index.md")
+        with open(path, "w") as f:
+            f.write(make_document(rng, blocks, words, mix))
+        paths.append(path)
+    return paths
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic content tree")
+    parser.add_argument("root", type=str, help="Directory to write the content tree to")
+    parser.add_argument("--pages", type=int, help="Number of pages", default=100)
+    parser.add_argument("--blocks", type=int, help="Blocks per page", default=50)
+    parser.add_argument("--words", type=int, help="Words per paragraph", default=60)
+    parser.add_argument("--mix", type=parse_mix, help="Block weights, e.g. heading=1,paragraph=6,list=2,code=1,quote=1", default=None)
+    parser.add_argument("--seed", type=int, help="Random seed", default=0)
+    args = parser.parse_args()
+    paths = generate_corpus(args.root, args.pages, args.blocks, args.words, args.mix, args.seed)
+    print(f"Wrote {len(paths)} pages to {args.root}")
+
+if __name__ == "__main__":
+    main()
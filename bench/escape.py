@@ -0,0 +1,43 @@
+# Compares rendering a parsed document with and without HTML escaping
+import argparse
+import pathlib
+import random
+import sys
+import timeit
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent.resolve() / "src"))
+
+from corpus import make_document
+import htmlnode
+import leafnode
+from parse import markdown_to_html_node
+
+def raw_props(props):
+    # props_to_html before escaping: no escaping, no cache
+    return "".join(f" {key}=\"{val}\"" for (key, val) in props.items())
+
+def render_time(node, repeat):
+    node.to_html() # Warm up (props cache, allocator)
+    return min(timeit.repeat(node.to_html, number=3, repeat=repeat)) / 3
+
+def main():
+    parser = argparse.ArgumentParser(description="HTML escaping overhead benchmark")
+    parser.add_argument("--blocks", type=int, help="Blocks in the synthetic document", default=5000)
+    parser.add_argument("--repeat", type=int, help="Timing repetitions", default=7)
+    args = parser.parse_args()
+
+    node = markdown_to_html_node(make_document(random.Random(0), args.blocks))
+    escaped = render_time(node, args.repeat)
+    (escape_text, render_props) = (leafnode.escape_text, htmlnode.render_props)
+    leafnode.escape_text = lambda text: text
+    htmlnode.render_props = raw_props
+    try:
+        unescaped = render_time(node, args.repeat)
+    finally:
+        (leafnode.escape_text, htmlnode.render_props) = (escape_text, render_props)
+    print(f"{'unescaped':>10}: {unescaped * 1000:8.2f} ms")
+    print(f"{'escaped':>10}: {escaped * 1000:8.2f} ms")
+    print(f"{'overhead':>10}: {(escaped / unescaped - 1) * 100:8.2f}%")
+
+if __name__ == "__main__":
+    main()
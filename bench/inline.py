@@ -0,0 +1,50 @@
+# Compares the single-pass inline tokenizer against the old five-pass split chain
+import argparse
+import pathlib
+import random
+import sys
+import timeit
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent.resolve() / "src"))
+
+from corpus import make_paragraph
+from parse import (
+    TextType,
+    split_nodes_delimiter,
+    split_nodes_images,
+    split_nodes_links,
+    text_to_textnodes,
+)
+from textnode import TextNode
+
+def split_chain(text):
+    node = TextNode(text, TextType.TEXT)
+    nodes = split_nodes_delimiter([node], "**", TextType.BOLD)
+    nodes = split_nodes_delimiter(nodes, "*", TextType.ITALIC)
+    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+    nodes = split_nodes_images(nodes)
+    nodes = split_nodes_links(nodes)
+    return nodes
+
+def main():
+    parser = argparse.ArgumentParser(description="Inline tokenizer benchmark")
+    parser.add_argument("--paragraphs", type=int, help="Paragraphs per document", default=2000)
+    parser.add_argument("--words", type=int, help="Words per paragraph", default=80)
+    parser.add_argument("--repeat", type=int, help="Timing repetitions", default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    paragraphs = [make_paragraph(rng, args.words) for _ in range(args.paragraphs)]
+    for p in paragraphs:
+        if split_chain(p) != text_to_textnodes(p):
+            raise AssertionError(f"tokenizer output differs from split chain: {p}")
+
+    results = {}
+    for name, fn in (("split_chain", split_chain), ("tokenizer", text_to_textnodes)):
+        best = min(timeit.repeat(lambda: [fn(p) for p in paragraphs], number=1, repeat=args.repeat))
+        results[name] = best
+        print(f"{name:>12}: {best * 1000:8.2f} ms ({args.paragraphs / best:,.0f} paragraphs/sec)")
+    print(f"{'speedup':>12}: {results['split_chain'] / results['tokenizer']:8.2f}x")
+
+if __name__ == "__main__":
+    main()
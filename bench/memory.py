@@ -0,0 +1,61 @@
+# Reports peak allocation (tracemalloc) of parsing and rendering a large synthetic document
+import argparse
+import gc
+import pathlib
+import os
+import random
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent.resolve() / "src"))
+
+from corpus import make_document
+from parse import configure, generate_page, markdown_to_document, text_to_textnodes
+
+def peak(fn):
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    (_, peak_bytes) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (result, peak_bytes)
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse/render memory benchmark")
+    parser.add_argument("--blocks", type=int, help="Blocks in the synthetic document", default=5000)
+    args = parser.parse_args()
+
+    md_doc = make_document(random.Random(0), args.blocks)
+    (nodes, inline_peak) = peak(lambda: [text_to_textnodes(b) for b in md_doc.split("\n\n")])
+    del nodes
+    (document, parse_peak) = peak(lambda: markdown_to_document(md_doc))
+    (_, render_peak) = peak(lambda: document.node.to_html())
+    del document
+    (whole_peak, stream_peak) = page_peaks(md_doc)
+    print(f"document: {len(md_doc) / 1e6:.2f} MB, {args.blocks} blocks")
+    print(f"  text_to_textnodes peak: {inline_peak / 1e6:8.2f} MB")
+    print(f"  markdown_to_document peak: {parse_peak / 1e6:8.2f} MB")
+    print(f"  to_html peak: {render_peak / 1e6:8.2f} MB")
+    print(f"  generate_page peak: {whole_peak / 1e6:8.2f} MB")
+    print(f"  generate_page (streamed) peak: {stream_peak / 1e6:8.2f} MB")
+
+def page_peaks(md_doc):
+    # generate_page on a file, reading it whole and then streaming it
+    with tempfile.TemporaryDirectory() as tmp:
+        from_path = os.path.join(tmp, "page.md")
+        template_path = os.path.join(tmp, "template.html")
+        with open(from_path, "w") as f:
+            f.write("# Title\n\n" + md_doc)
+        with open(template_path, "w") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+        to_path = os.path.join(tmp, "out", "page.md")
+        peaks = []
+        for stream_bytes in (1 << 62, 0):
+            configure(stream_bytes=stream_bytes)
+            peaks.append(peak(lambda: generate_page(from_path, to_path, template_path))[1])
+            os.remove(os.path.join(tmp, "out", "page.html"))
+        return peaks
+
+if __name__ == "__main__":
+    main()
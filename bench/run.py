@@ -0,0 +1,142 @@
+# Per-stage and full-build timings over a synthetic corpus, reported as JSON
+import argparse
+import contextlib
+import io
+import json
+import os
+import pathlib
+import platform
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent.resolve() / "src"))
+
+from corpus import DEFAULT_MIX, generate_corpus, parse_mix
+from parse import (
+    GENERATOR_VERSION,
+    BlockType,
+    block_to_block_type,
+    generate_pages_recursive,
+    lex_blocks,
+    markdown_to_blocks,
+    markdown_to_document,
+    text_to_textnodes,
+)
+from template import load_template
+
+parent_dir = pathlib.Path(__file__).parent.parent.resolve()
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return (result, time.perf_counter() - start)
+
+def inline_texts(block, block_type):
+    # The text each create_* function hands to text_to_textnodes
+    match block_type:
+        case BlockType.CODE:
+            return []
+        case BlockType.HEADING:
+            return [block.lstrip("#")[1:]]
+        case BlockType.QUOTE:
+            return ["\n".join(line[2:] for line in block.split("\n"))]
+        case BlockType.UNORDERED_LIST:
+            return [line[2:] for line in block.split("\n")]
+        case BlockType.ORDERED_LIST:
+            return [line[line.index(".") + 2:] for line in block.split("\n")]
+    return [block]
+
+def stage(seconds, items, unit):
+    return {"seconds": round(seconds, 6), unit: items, f"{unit}_per_sec": round(items / seconds, 1) if seconds > 0 else None}
+
+def run_stages(paths, template_path, out_dir):
+    stages = {}
+    docs = []
+    for path in paths:
+        with open(path, "r") as f:
+            docs.append(f.read())
+
+    (blocks, seconds) = timed(lambda: [markdown_to_blocks(d) for d in docs])
+    stages["markdown_to_blocks"] = stage(seconds, len(docs), "pages")
+    (_, seconds) = timed(lambda: [list(lex_blocks(d)) for d in docs])
+    stages["lex_blocks"] = stage(seconds, len(docs), "pages")
+    flat = [b for page in blocks for b in page]
+    (types, seconds) = timed(lambda: [block_to_block_type(b) for b in flat])
+    stages["block_to_block_type"] = stage(seconds, len(flat), "blocks")
+    texts = [t for (b, bt) in zip(flat, types) for t in inline_texts(b, bt)]
+    (_, seconds) = timed(lambda: [text_to_textnodes(t) for t in texts])
+    stages["text_to_textnodes"] = stage(seconds, len(texts), "texts")
+    (documents, seconds) = timed(lambda: [markdown_to_document(d) for d in docs])
+    stages["markdown_to_document"] = stage(seconds, len(docs), "pages")
+    (html, seconds) = timed(lambda: [d.node.to_html() for d in documents])
+    stages["to_html"] = stage(seconds, len(docs), "pages")
+
+    template = load_template(template_path)
+    def render_all():
+        pages = []
+        for (document, content) in zip(documents, html):
+            out = io.StringIO()
+            template.render(out, {"Title": document.title, "Content": content})
+            pages.append(out.getvalue())
+        return pages
+    (pages, seconds) = timed(render_all)
+    stages["template"] = stage(seconds, len(docs), "pages")
+    def write_all():
+        for (i, page) in enumerate(pages):
+            with open(os.path.join(out_dir, f"{i}.html"), "w") as f:
+                f.write(page)
+    (_, seconds) = timed(write_all)
+    stages["write"] = stage(seconds, len(docs), "pages")
+    return stages
+
+def run_build(content_dir, dest_dir, template_path, jobs, pages):
+    with contextlib.redirect_stdout(io.StringIO()):
+        (_, full) = timed(lambda: generate_pages_recursive(content_dir, dest_dir, template_path, jobs=jobs))
+        (_, noop) = timed(lambda: generate_pages_recursive(content_dir, dest_dir, template_path, jobs=jobs))
+    return {
+        "full": stage(full, pages, "pages"),
+        "noop_rebuild": stage(noop, pages, "pages"),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Static site generator benchmark")
+    parser.add_argument("--pages", type=int, help="Number of pages", default=200)
+    parser.add_argument("--blocks", type=int, help="Blocks per page", default=50)
+    parser.add_argument("--words", type=int, help="Words per paragraph", default=60)
+    parser.add_argument("--mix", type=parse_mix, help="Block weights, e.g. heading=1,paragraph=6,list=2,code=1,quote=1", default=DEFAULT_MIX)
+    parser.add_argument("--jobs", type=int, help="Workers for the full build", default=os.cpu_count() or 1)
+    parser.add_argument("--template", type=str, help="Template to render with", default=f"{parent_dir}/template.html")
+    parser.add_argument("--output", type=str, help="Write the JSON report here instead of stdout", default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        content_dir = os.path.join(tmp, "content")
+        paths = generate_corpus(content_dir, args.pages, args.blocks, args.words, args.mix)
+        size = sum(os.path.getsize(p) for p in paths)
+        stage_dir = os.path.join(tmp, "stages")
+        os.makedirs(stage_dir)
+        report = {
+            "generator_version": GENERATOR_VERSION,
+            "python": platform.python_version(),
+            "corpus": {
+                "pages": args.pages,
+                "blocks_per_page": args.blocks,
+                "words_per_paragraph": args.words,
+                "mix": args.mix,
+                "bytes": size,
+            },
+            "stages": run_stages(paths, args.template, stage_dir),
+            "build": run_build(content_dir, os.path.join(tmp, "public"), args.template, args.jobs, args.pages),
+        }
+        report["build"]["jobs"] = args.jobs
+
+    text = json.dumps(report, indent=2)
+    if args.output != None:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
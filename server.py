@@ -1,28 +1,315 @@
-import os
 import argparse
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+import collections
+import email.utils
+import functools
+import io
+import json
+import os
+import threading
+import urllib.parse
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+# Must match COMPRESSIBLE_EXTENSIONS in src/compress.py, which writes the sidecars
+COMPRESSIBLE_EXTENSIONS = (".html", ".css", ".js", ".svg", ".txt")
+# Written by src/fingerprint.py; its "urls" values are the fingerprinted URLs
+FINGERPRINTS_NAME = ".asset-fingerprints.json"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def accepts_gzip(accept_encoding):
+    # True unless the client omits gzip or sends gzip;q=0
+    for token in (accept_encoding or "").split(","):
+        (coding, _, params) = token.strip().partition(";")
+        if coding.strip().lower() not in ("gzip", "*"):
+            continue
+        params = params.replace(" ", "")
+        return params not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+class FileCache:
+    # Bounded LRU of file contents, keyed by path and invalidated when the
+    # file's mtime or size changes. Files over max_file_bytes are never cached.
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_file_bytes=1024 * 1024):
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self.size = 0
+        self.entries = collections.OrderedDict()  # path -> (mtime_ns, size, data)
+        self.lock = threading.Lock()
+
+    def __repr__(self):
+        return f"FileCache(entries={len(self.entries)}, size={self.size}, max_bytes={self.max_bytes})"
+
+    def cacheable(self, st):
+        return st.st_size <= self.max_file_bytes
+
+    def get(self, path, st):
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry == None:
+                return None
+            if entry[0] != st.st_mtime_ns or entry[1] != st.st_size:
+                self.drop(path)
+                return None
+            self.entries.move_to_end(path)
+            return entry[2]
+
+    def put(self, path, st, data):
+        if len(data) > self.max_file_bytes:
+            return
+        with self.lock:
+            self.drop(path)
+            self.entries[path] = (st.st_mtime_ns, st.st_size, data)
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                (_, evicted) = self.entries.popitem(last=False)
+                self.size -= len(evicted[2])
+
+    def drop(self, path):
+        entry = self.entries.pop(path, None)
+        if entry != None:
+            self.size -= len(entry[2])
+
+
+class FingerprintIndex:
+    # The URLs the last build fingerprinted, read from its record under
+    # directory and re-read whenever that file changes. Only those are served
+    # as immutable: their names change whenever their contents do.
+    def __init__(self, directory):
+        self.path = os.path.join(directory, FINGERPRINTS_NAME)
+        self.signature = None
+        self.urls = frozenset()
+        self.lock = threading.Lock()
+
+    def __repr__(self):
+        return f"FingerprintIndex(path={self.path}, urls={len(self.urls)})"
+
+    def immutable(self, url_path):
+        try:
+            st = os.stat(self.path)
+            signature = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            signature = None
+        with self.lock:
+            if signature != self.signature:
+                self.signature = signature
+                self.urls = frozenset(self.load() if signature != None else ())
+            return url_path in self.urls
+
+    def load(self):
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f).get("urls", {}).values()
+        except (OSError, ValueError):
+            return ()
+
+
+class CachingRequestHandler(SimpleHTTPRequestHandler):
+    # HTTP/1.1 keep-alive handler that serves small files from a shared
+    # FileCache (one stat per hit) and large files with sendfile
+    protocol_version = "HTTP/1.1"
+    timeout = 30  # Close idle keep-alive connections so their threads exit
+    cache = None
+    fingerprints = None
+
+    def __init__(self, *args, cache=None, fingerprints=None, **kwargs):
+        self.cache = cache
+        self.fingerprints = fingerprints
+        super().__init__(*args, **kwargs)
+
+    def handle_one_request(self):
+        # Wait for the next request without a worker slot, so idle keep-alive
+        # connections never hold one a waiting client could use
+        try:
+            if self.rfile.peek(1) == b"":
+                self.close_connection = True
+                return
+        except OSError:  # Includes the idle timeout
+            self.close_connection = True
+            return
+        slots = getattr(self.server, "slots", None)
+        if slots == None:
+            super().handle_one_request()
+            return
+        with slots:
+            super().handle_one_request()
+
+    def send_head(self):
+        # The build keeps its indexes (.build-manifest.json, ...) in the served
+        # tree; those and any other dot-file are not part of the site
+        url_path = urllib.parse.unquote(urllib.parse.urlsplit(self.path).path)
+        if any(part.startswith(".") for part in url_path.split("/")):
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            index = os.path.join(path, "index.html")
+            if not urllib.parse.urlsplit(self.path).path.endswith("/") or not os.path.isfile(index):
+                return super().send_head()  # Redirect or directory listing
+            path = index
+        if path.endswith("/"):
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+        immutable = self.fingerprints != None and self.fingerprints.immutable(url_path)
+        if self.not_modified(st):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            if immutable:
+                self.send_header("Cache-Control", IMMUTABLE_CACHE_CONTROL)
+            self.end_headers()
+            return None
+
+        ctype = self.guess_type(path)
+        compressible = path.endswith(COMPRESSIBLE_EXTENSIONS)
+        encoding = None
+        if compressible and accepts_gzip(self.headers.get("Accept-Encoding")):
+            sidecar = self.fresh_sidecar(path, st)
+            if sidecar != None:
+                (path, st) = sidecar
+                encoding = "gzip"
+
+        body = self.read_cached(path, st)
+        if body == None:
+            try:
+                body = open(path, "rb")
+            except OSError:
+                self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+                return None
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-type", ctype)
+        self.send_header("Content-Length", str(st.st_size))
+        self.send_header("Last-Modified", self.date_time_string(st.st_mtime))
+        if encoding != None:
+            self.send_header("Content-Encoding", encoding)
+        if compressible:
+            self.send_header("Vary", "Accept-Encoding")
+        if immutable:
+            self.send_header("Cache-Control", IMMUTABLE_CACHE_CONTROL)
+        self.end_headers()
+        return body
+
+    def fresh_sidecar(self, path, st):
+        # The build gives a .gz sidecar its source's mtime; anything else is stale
+        try:
+            sidecar_st = os.stat(path + ".gz")
+        except OSError:
+            return None
+        if sidecar_st.st_mtime_ns != st.st_mtime_ns:
+            return None
+        return (path + ".gz", sidecar_st)
+
+    def read_cached(self, path, st):
+        # A BytesIO over cached contents, or None for files the cache won't hold
+        if self.cache == None or not self.cache.cacheable(st):
+            return None
+        data = self.cache.get(path, st)
+        if data == None:
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+            except OSError:
+                return None
+            if len(data) != st.st_size:
+                return None  # Changed under us; serve it uncached
+            self.cache.put(path, st, data)
+        return io.BytesIO(data)
+
+    def not_modified(self, st):
+        if "If-Modified-Since" not in self.headers or "If-None-Match" in self.headers:
+            return False
+        try:
+            ims = email.utils.parsedate_to_datetime(self.headers["If-Modified-Since"])
+        except (TypeError, IndexError, OverflowError, ValueError):
+            return False
+        return ims.tzinfo != None and int(st.st_mtime) <= ims.timestamp()
+
+    def copyfile(self, source, outputfile):
+        if isinstance(source, io.BytesIO):
+            outputfile.write(source.getbuffer())
+            return
+        # Real file: let the kernel copy it to the socket
+        try:
+            self.connection.sendfile(source)
+        except (AttributeError, OSError, ValueError):
+            super().copyfile(source, outputfile)
+
+
+class KeepAliveHTTPServer(ThreadingHTTPServer):
+    # A thread per connection, but at most `workers` requests are read and
+    # answered at once. An idle keep-alive client only waits on its own
+    # thread, never on a slot another client is waiting for.
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, server_address, handler_class, workers=16):
+        self.workers = workers
+        self.slots = threading.BoundedSemaphore(workers)
+        super().__init__(server_address, handler_class)
+
+
+def make_server(
+    server_class=KeepAliveHTTPServer,
+    handler_class=CachingRequestHandler,
+    port=8888,
+    directory=None,
+    workers=16,
+    cache_bytes=64 * 1024 * 1024,
+):
+    # Serve from directory without chdir-ing the whole process, so a build can share it
+    kwargs = {"directory": directory}
+    if issubclass(handler_class, CachingRequestHandler):
+        kwargs["cache"] = FileCache(max_bytes=cache_bytes)
+        kwargs["fingerprints"] = FingerprintIndex(directory if directory != None else os.getcwd())
+    handler = functools.partial(handler_class, **kwargs)
+    if issubclass(server_class, KeepAliveHTTPServer):
+        return server_class(("", port), handler, workers=workers)
+    return server_class(("", port), handler)
 
 
 def run(
-    server_class=HTTPServer,
-    handler_class=SimpleHTTPRequestHandler,
+    server_class=KeepAliveHTTPServer,
+    handler_class=CachingRequestHandler,
     port=8888,
     directory=None,
+    workers=16,
+    cache_bytes=64 * 1024 * 1024,
 ):
-    if directory:  # Change the current working directory if directory is specified
-        os.chdir(directory)
-    server_address = ("", port)
-    httpd = server_class(server_address, handler_class)
-    print(f"Serving HTTP on http://localhost:{port} from directory '{directory}'...")
+    httpd = make_server(server_class, handler_class, port, directory, workers, cache_bytes)
+    print(f"Serving HTTP on http://localhost:{port} from directory '{directory}' with {workers} workers...")
     httpd.serve_forever()
 
 
+def run_in_background(port=8888, directory=None):
+    # Used by the site generator's --watch mode; serves on a daemon thread
+    thread = threading.Thread(
+        target=run, kwargs={"port": port, "directory": directory}, daemon=True
+    )
+    thread.start()
+    return thread
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="HTTP Server")
     parser.add_argument(
         "--dir", type=str, help="Directory to serve files from", default="."
     )
     parser.add_argument("--port", type=int, help="Port to serve HTTP on", default=8888)
+    parser.add_argument(
+        "--workers", type=int, help="Requests handled at once (idle keep-alive connections don't count)", default=16
+    )
+    parser.add_argument(
+        "--cache-mb", type=int, help="In-memory file cache size in MB", default=64
+    )
     args = parser.parse_args()
 
-    run(port=args.port, directory=args.dir)
+    run(
+        port=args.port,
+        directory=args.dir,
+        workers=args.workers,
+        cache_bytes=args.cache_mb * 1024 * 1024,
+    )
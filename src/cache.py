@@ -0,0 +1,91 @@
+import collections
+import glob
+import os
+import sqlite3
+
+# DiskCache.put() writes once this many entries are pending
+DISK_CACHE_BATCH = 64
+
+class LRUCache:
+    # In-memory LRU bounded by the total size of its values (as given to put)
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = collections.OrderedDict() # key -> (size, value)
+
+    def __repr__(self):
+        return f"LRUCache(entries={len(self.entries)}, size={self.size}, max_bytes={self.max_bytes})"
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry == None:
+            return None
+        self.entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key, value, size):
+        if size > self.max_bytes:
+            return
+        old = self.entries.pop(key, None)
+        if old != None:
+            self.size -= old[0]
+        self.entries[key] = (size, value)
+        self.size += size
+        while self.size > self.max_bytes:
+            (_, evicted) = self.entries.popitem(last=False)
+            self.size -= evicted[0]
+
+class DiskCache:
+    # Persistent string key/value store: one sqlite file per name and version
+    # under cache_dir. Bumping the version starts a fresh store and deletes
+    # the old ones. Safe to share between build worker processes.
+    def __init__(self, cache_dir, name, version):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, f"{name}-v{version}.sqlite")
+        for stale in glob.glob(os.path.join(cache_dir, f"{name}-v*.sqlite*")):
+            if not stale.startswith(self.path):
+                os.remove(stale)
+        self.conn = None
+        self.pid = None
+        self.pending = {} # key -> value, written in one short transaction
+
+    def __repr__(self):
+        return f"DiskCache(path={self.path})"
+
+    def connect(self):
+        # Connections can't cross a fork, so each process opens its own.
+        # WAL lets readers carry on while another process commits a batch.
+        if self.conn == None or self.pid != os.getpid():
+            self.conn = sqlite3.connect(self.path, timeout=30)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT)")
+            self.conn.commit()
+            self.pid = os.getpid()
+            self.pending = {} # the parent's batch is the parent's to write
+        return self.conn
+
+    def get(self, key):
+        conn = self.connect()
+        if key in self.pending:
+            return self.pending[key]
+        row = conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+        return row[0] if row != None else None
+
+    def put(self, key, value):
+        # Batched so no write lock is held between puts: workers sharing the
+        # file only ever wait for one short commit
+        self.connect()
+        self.pending[key] = value
+        if len(self.pending) >= DISK_CACHE_BATCH:
+            self.flush()
+
+    def flush(self):
+        if len(self.pending) > 0:
+            with self.connect():
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO entries (key, value) VALUES (?, ?)", self.pending.items()
+                )
+            self.pending = {}
@@ -0,0 +1,58 @@
+from concurrent.futures import ThreadPoolExecutor
+import gzip
+import os
+
+from utils import AtomicWriter
+
+COMPRESSIBLE_EXTENSIONS = (".html", ".css", ".js", ".svg", ".txt")
+SIDECAR_SUFFIX = ".gz"
+
+def sidecar_is_current(path, sidecar_path):
+    # Sidecars carry their source's mtime, so equal mtimes mean up to date
+    try:
+        return os.stat(sidecar_path).st_mtime_ns == os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+def compress_file(path):
+    # Writes path.gz at maximum level; returns True if a sidecar was (re)written
+    sidecar_path = path + SIDECAR_SUFFIX
+    if sidecar_is_current(path, sidecar_path):
+        return False
+    st = os.stat(path)
+    with open(path, "rb") as f:
+        data = f.read()
+    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(compressed) >= len(data):
+        # Not worth serving; make sure no stale sidecar is left behind
+        if os.path.exists(sidecar_path):
+            os.remove(sidecar_path)
+        return False
+    with AtomicWriter(sidecar_path, "wb") as out:
+        out.write(compressed)
+    os.utime(sidecar_path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    return True
+
+def is_sidecar(name):
+    # Only "<compressible>.gz" names are ours; other .gz files (archives) are assets
+    return name.endswith(SIDECAR_SUFFIX) and name[:-len(SIDECAR_SUFFIX)].endswith(COMPRESSIBLE_EXTENSIONS)
+
+def precompress(root, jobs = 1):
+    # Build stage: gzip sidecars for compressible outputs under root, skipping
+    # ones that are up to date and removing sidecars whose source is gone
+    paths = []
+    removed = 0
+    for (dir_path, dir_names, file_names) in os.walk(root):
+        names = set(file_names)
+        for name in sorted(file_names):
+            path = os.path.join(dir_path, name)
+            if name.endswith(COMPRESSIBLE_EXTENSIONS):
+                paths.append(path)
+            elif is_sidecar(name) and name[:-len(SIDECAR_SUFFIX)] not in names:
+                os.remove(path)
+                removed += 1
+    # zlib releases the GIL, so threads compress in parallel
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        written = sum(executor.map(compress_file, paths))
+    print(f"Compressed {written} of {len(paths)} files ({removed} stale sidecars removed).")
+    return written
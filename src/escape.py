@@ -0,0 +1,38 @@
+# HTML escaping for the render path. Most strings have nothing to escape, so
+# the membership checks come first; str.replace per special character beats
+# str.translate with multi-character replacements by an order of magnitude.
+
+# (character, entity) pairs; "&" first so entities aren't escaped twice
+TEXT_ENTITIES = (("&", "&amp;"), ("<", "&lt;"), (">", "&gt;"))
+ATTR_ENTITIES = TEXT_ENTITIES + (("\"", "&quot;"),)
+
+# Rendered attribute strings by props items; bounded by clearing when full
+PROPS_CACHE = {}
+PROPS_CACHE_SIZE = 4096
+
+def escape_text(text):
+    if "&" not in text and "<" not in text and ">" not in text:
+        return text
+    for (char, entity) in TEXT_ENTITIES:
+        text = text.replace(char, entity)
+    return text
+
+def escape_attr(value):
+    value = str(value)
+    if "&" not in value and "<" not in value and ">" not in value and "\"" not in value:
+        return value
+    for (char, entity) in ATTR_ENTITIES:
+        value = value.replace(char, entity)
+    return value
+
+def render_props(props):
+    # ' key="value" ...' for a props dict; repeated dicts (every link to the
+    # same page, every image with the same alt) are rendered once
+    key = tuple(props.items())
+    html = PROPS_CACHE.get(key)
+    if html == None:
+        if len(PROPS_CACHE) >= PROPS_CACHE_SIZE:
+            PROPS_CACHE.clear()
+        html = "".join(f" {name}=\"{escape_attr(val)}\"" for (name, val) in key)
+        PROPS_CACHE[key] = html
+    return html
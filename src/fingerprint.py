@@ -0,0 +1,129 @@
+import json
+import os
+import urllib.parse
+
+from manifest import file_hash
+from references import page_url
+from utils import AtomicWriter, copy_file, ensure_dir, load_json, walk_files
+
+# Build-side record {rel: {size, mtime, hash, fingerprint}}; its "urls" are the asset URL map
+FINGERPRINTS_NAME = ".asset-fingerprints.json"
+FINGERPRINT_PAGES_NAME = ".fingerprint-pages.json"
+HASH_LENGTH = 10
+
+def fingerprint_name(rel, digest):
+    # images/a.png -> images/a.<hash>.png
+    (root, ext) = os.path.splitext(rel)
+    return f"{root}.{digest[:HASH_LENGTH]}{ext}"
+
+def asset_url(rel):
+    return "/" + rel.replace(os.sep, "/")
+
+def fingerprint_assets(from_dir, to_dir, link = False):
+    # Build stage, after dir_sync: a content-hashed copy of every synced static
+    # asset next to the plain one (so minified CSS is what gets hashed). Hashes
+    # are reused while an asset's size and mtime are unchanged, and copies for
+    # old contents are removed. Returns {asset url: fingerprinted url}.
+    record_path = os.path.join(to_dir, FINGERPRINTS_NAME)
+    previous = load_json(record_path, {}).get("files", {})
+    files = {}
+    hashed = 0
+    for (rel, _) in walk_files(from_dir):
+        src = os.path.join(to_dir, rel)
+        st = os.stat(src)
+        entry = previous.get(rel)
+        if entry == None or entry["size"] != st.st_size or entry["mtime"] != st.st_mtime_ns:
+            digest = file_hash(src)
+            entry = {
+                "size": st.st_size,
+                "mtime": st.st_mtime_ns,
+                "hash": digest,
+                "fingerprint": fingerprint_name(rel, digest),
+            }
+            hashed += 1
+        dst = os.path.join(to_dir, entry["fingerprint"])
+        if not os.path.isfile(dst):
+            ensure_dir(os.path.dirname(dst))
+            copy_file(src, dst, link)
+        files[rel] = entry
+
+    stale = set(entry["fingerprint"] for entry in previous.values())
+    stale -= set(entry["fingerprint"] for entry in files.values())
+    for rel in sorted(stale):
+        path = os.path.join(to_dir, rel)
+        if os.path.isfile(path):
+            os.remove(path)
+
+    urls = {asset_url(rel): asset_url(entry["fingerprint"]) for (rel, entry) in files.items()}
+    with AtomicWriter(record_path) as f:
+        json.dump({"files": files, "urls": urls}, f, indent=1, sort_keys=True)
+    print(f"Fingerprinted {from_dir}: {hashed} hashed, {len(files) - hashed} unchanged, {len(stale)} removed.")
+    return urls
+
+def remove_fingerprints(to_dir):
+    # Undoes fingerprint_assets when a build runs without it
+    record_path = os.path.join(to_dir, FINGERPRINTS_NAME)
+    for entry in load_json(record_path, {}).get("files", {}).values():
+        path = os.path.join(to_dir, entry["fingerprint"])
+        if os.path.isfile(path):
+            os.remove(path)
+    if os.path.isfile(record_path):
+        os.remove(record_path)
+
+def url_key(url):
+    # The site-absolute path an URL map is keyed by, None for anything else
+    if not url.startswith("/") or url.startswith("//"):
+        return None
+    return urllib.parse.urlsplit(url).path
+
+def rewrite_url(url, urls):
+    # Swaps the path of a site-absolute URL for its fingerprinted one, keeping
+    # any query or fragment
+    key = url_key(url)
+    if key == None or key not in urls:
+        return url
+    return urls[key] + url[len(key):]
+
+class FingerprintIndex:
+    # What each page was rendered against: {page url: {asset url: fingerprinted
+    # url or None}} for its site-absolute links and images. refresh() drops
+    # pages whose assets got new fingerprints, so the build regenerates them.
+    def __init__(self, path, urls, pages = None):
+        self.path = path
+        self.urls = urls
+        self.pages = pages if pages != None else {}
+
+    def __repr__(self):
+        return f"FingerprintIndex(path={self.path}, urls={len(self.urls)}, pages={len(self.pages)})"
+
+    def refresh(self):
+        stale = []
+        for (page, assets) in self.pages.items():
+            if any(self.urls.get(url) != fingerprinted for (url, fingerprinted) in assets.items()):
+                stale.append(page)
+        for page in stale:
+            del self.pages[page]
+        return stale
+
+    # Page index interface used by the build (see parse.run_and_record)
+    def has_page(self, output):
+        return page_url(output) in self.pages
+
+    def update_page(self, output, info):
+        assets = {}
+        for url in info["links"] + info["images"]:
+            key = url_key(url)
+            if key != None:
+                assets[key] = self.urls.get(key)
+        self.pages[page_url(output)] = assets
+
+    def remove_page(self, output):
+        self.pages.pop(page_url(output), None)
+
+    def save(self):
+        with AtomicWriter(self.path) as f:
+            json.dump({"pages": self.pages}, f, indent=1, sort_keys=True)
+
+def load_fingerprint_index(dest_dir, urls):
+    path = os.path.join(dest_dir, FINGERPRINT_PAGES_NAME)
+    return FingerprintIndex(path, urls, load_json(path, {}).get("pages"))
@@ -0,0 +1,146 @@
+import hashlib
+import re
+
+from cache import DiskCache
+from escape import escape_text
+
+# Bump when the generated markup changes. With a digest of the registered
+# rules (see highlight_version) it versions the highlight cache, and through
+# parse.generator_version the block cache and page manifest too
+HIGHLIGHT_VERSION = "1"
+
+LANGUAGE_NAME_REGEX = re.compile(r"[\w+#.-]+")
+# Language name or alias -> (canonical name, compiled rules)
+LANGUAGES = {}
+# Set through configure_cache(); None means code is highlighted every time
+HIGHLIGHT_CACHE = None
+
+def register_language(names, rules):
+    # rules: [(class, regex)] tried in order at each position; a match becomes
+    # <span class="hl-<class>">. Regexes must not match "" and must use only
+    # non-capturing groups. The first name is the canonical one (cache key).
+    # Patterns should be linear on unterminated input: let strings and
+    # comments run to the end of the line/text rather than fail and rescan.
+    pattern = re.compile("|".join(f"(?P<{cls}>{regex})" for (cls, regex) in rules), re.M)
+    for name in names:
+        LANGUAGES[name] = (names[0], pattern)
+
+def highlight_version():
+    # Changes with HIGHLIGHT_VERSION and whenever a language is added or its rules change
+    digest = hashlib.sha1()
+    for (name, (canonical, pattern)) in sorted(LANGUAGES.items()):
+        digest.update(f"{name}\0{canonical}\0{pattern.pattern}\n".encode("utf-8"))
+    return f"{HIGHLIGHT_VERSION}-{digest.hexdigest()[:10]}"
+
+def code_language(info):
+    # Fence info string ("python", "js title=x") -> language name; None when
+    # empty or not a name ("```print(1)" is code on the fence line)
+    words = info.split()
+    if len(words) == 0 or LANGUAGE_NAME_REGEX.fullmatch(words[0]) == None:
+        return None
+    return words[0].lower()
+
+def highlight_tokens(code, pattern):
+    # (class or None, text) pairs covering the whole of code
+    pos = 0
+    for match in pattern.finditer(code):
+        if match.start() > pos:
+            yield (None, code[pos:match.start()])
+        yield (match.lastgroup, match.group())
+        pos = match.end()
+    if pos < len(code):
+        yield (None, code[pos:])
+
+def render_tokens(code, pattern):
+    parts = []
+    for (cls, text) in highlight_tokens(code, pattern):
+        if cls == None:
+            parts.append(escape_text(text))
+        else:
+            parts.append(f"<span class=\"hl-{cls}\">{escape_text(text)}</span>")
+    return "".join(parts)
+
+def highlight_code(code, language):
+    # Escaped, span-classed HTML for code, or None when the language isn't
+    # registered. Cached by language and content hash across builds.
+    entry = LANGUAGES.get(language)
+    if entry == None:
+        return None
+    (name, pattern) = entry
+    cache = HIGHLIGHT_CACHE
+    if cache == None:
+        return render_tokens(code, pattern)
+    key = f"{name}:{hashlib.sha1(code.encode('utf-8')).hexdigest()}"
+    html = cache.get(key)
+    if html == None:
+        html = render_tokens(code, pattern)
+        cache.put(key, html)
+    return html
+
+def configure_cache(cache_dir):
+    global HIGHLIGHT_CACHE
+    HIGHLIGHT_CACHE = DiskCache(cache_dir, "highlight", highlight_version()) if cache_dir != None else None
+
+def flush_cache():
+    if HIGHLIGHT_CACHE != None:
+        HIGHLIGHT_CACHE.flush()
+
+def word_regex(names):
+    return r"\b(?:" + "|".join(names.split()) + r")\b"
+
+# Unterminated strings stop at the end of the line
+DOUBLE_QUOTED = r'"(?:\\.|[^"\\\n])*"?'
+SINGLE_QUOTED = r"'(?:\\.|[^'\\\n])*'?"
+TRIPLE_QUOTED = r"\"\"\"[\s\S]*?(?:\"\"\"|\Z)|'''[\s\S]*?(?:'''|\Z)"
+C_COMMENT = r"/\*[\s\S]*?(?:\*/|\Z)"
+NUMBER = r"\b(?:0[xXoObB][\da-fA-F_]+|\d[\d_]*(?:\.\d+)?(?:[eE][+-]?\d+)?)\b"
+
+register_language(["python", "py", "python3"], [
+    ("comment", r"#[^\n]*"),
+    ("string", r"(?:\b[rRbBuUfF]{1,2})?(?:" + TRIPLE_QUOTED + "|" + DOUBLE_QUOTED + "|" + SINGLE_QUOTED + ")"),
+    ("keyword", word_regex(
+        "False None True and as assert async await break class continue def del elif else except "
+        "finally for from global if import in is lambda nonlocal not or pass raise return try while with yield"
+    )),
+    ("builtin", word_regex(
+        "abs all any bool bytes dict enumerate filter float getattr hasattr input int isinstance len list "
+        "map max min next object open print range repr reversed set sorted str sum super tuple type zip self"
+    )),
+    ("number", NUMBER + "j?"),
+])
+
+register_language(["javascript", "js", "typescript", "ts"], [
+    ("comment", r"//[^\n]*|" + C_COMMENT),
+    ("string", DOUBLE_QUOTED + "|" + SINGLE_QUOTED + r"|`(?:\\[\s\S]|[^`\\])*`?"),
+    ("keyword", word_regex(
+        "async await break case catch class const continue debugger default delete do else export extends "
+        "false finally for from function if import in instanceof let new null of return static super switch "
+        "this throw true try typeof undefined var void while yield"
+    )),
+    ("builtin", word_regex("Array Boolean JSON Map Math Number Object Promise Set String console document window")),
+    ("number", NUMBER),
+])
+
+register_language(["bash", "sh", "shell", "zsh"], [
+    ("comment", r"(?:^|(?<=\s))#[^\n]*"),
+    ("string", DOUBLE_QUOTED + "|" + SINGLE_QUOTED),
+    ("variable", r"\$\{[^}\n]*\}?|\$(?:\w+|[@#?$!*-])"),
+    ("keyword", word_regex("case do done elif else esac export fi for function if in local return then until while")),
+    ("builtin", word_regex("alias cat cd cp echo exit grep ls mkdir mv printf pwd read rm sed set source test")),
+    ("number", NUMBER),
+])
+
+register_language(["json"], [
+    ("property", DOUBLE_QUOTED + r"(?=\s*:)"),
+    ("string", DOUBLE_QUOTED),
+    ("keyword", word_regex("true false null")),
+    ("number", r"-?" + NUMBER),
+])
+
+register_language(["css"], [
+    ("comment", C_COMMENT),
+    ("string", DOUBLE_QUOTED + "|" + SINGLE_QUOTED),
+    ("keyword", r"@[\w-]+|!important"),
+    ("property", r"(?<=[{;\s])[\w-]+(?=\s*:[^{};\n]*[;}\n])"),
+    ("number", r"#[\da-fA-F]{3,8}\b|-?\b\d+(?:\.\d+)?(?:%|[a-zA-Z]+)?"),
+])
@@ -1,4 +1,9 @@
+from escape import render_props
+
 class HTMLNode:
+    # Pages build one node per block and inline span; slots keep them dict-free
+    __slots__ = ("tag", "value", "props", "children")
+
     def __init__(self, tag = None, value = None, props = None, children = None):
         self.tag = tag # Node without a tag renders as raw text
         self.value = value # Node without a value is assumed to have children
@@ -19,16 +24,21 @@ class HTMLNode:
         return f"HTMLNode(tag={self.tag}, value={self.value}, props={self.props}, children={self.children})"
 
     def to_html(self):
+        return "".join(self.iter_html())
+
+    def iter_html(self):
+        # Yields the HTML in fragments so large trees never get concatenated per level
         if self.tag == None:
-            return self.value
+            yield self.value
         else:
             raise NotImplementedError
 
+    def write_html(self, stream):
+        write = stream.write
+        for fragment in self.iter_html():
+            write(fragment)
+
     def props_to_html(self):
         if self.props == None or len(self.props) == 0:
             return ""
-       
-        attrs = []
-        for key, val in self.props.items():
-            attrs.append(f"{key}=\"{val}\"")
-        return " " + " ".join(attrs)
+        return render_props(self.props)
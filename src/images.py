@@ -0,0 +1,146 @@
+import json
+import os
+import struct
+
+from manifest import file_hash
+from references import page_url, resolve_url
+from utils import AtomicWriter, load_json
+
+IMAGES_NAME = ".images.json"
+# Images past either limit are listed in the build report
+OVERSIZED_BYTES = 512 * 1024
+OVERSIZED_PIXELS = 2560 # Longest side
+
+JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+def read_image_size(path):
+    # (width, height) from the PNG/GIF/JPEG header, without decoding pixels; None otherwise
+    with open(path, "rb") as f:
+        head = f.read(26)
+        if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR":
+            return struct.unpack(">II", head[16:24])
+        if head[:6] in (b"GIF87a", b"GIF89a"):
+            return struct.unpack("<HH", head[6:10])
+        if head.startswith(b"\xff\xd8"):
+            f.seek(2)
+            return read_jpeg_size(f)
+    return None
+
+def read_jpeg_size(f):
+    # Walks the segment headers up to the first start-of-frame
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        if marker[1] in (0x01, 0xFF) or 0xD0 <= marker[1] <= 0xD7:
+            continue # Standalone markers and fill bytes have no length
+        length = f.read(2)
+        if len(length) < 2:
+            return None
+        if marker[1] in JPEG_SOF_MARKERS:
+            frame = f.read(5)
+            if len(frame) < 5:
+                return None
+            (height, width) = struct.unpack(">HH", frame[1:5])
+            return (width, height)
+        f.seek(struct.unpack(">H", length)[0] - 2, os.SEEK_CUR)
+
+def image_path(root, url):
+    # File behind a site-absolute image URL, None for external or relative ones
+    if not url.startswith("/") or url.startswith("//"):
+        return None
+    target = resolve_url("/", url)
+    if target == None:
+        return None
+    return os.path.join(root, target.lstrip("/"))
+
+class ImageIndex:
+    # Dimensions of the local images pages use, keyed by content hash so a
+    # touched or copied file isn't parsed again: {url: {size, mtime, hash}},
+    # {hash: [width, height]} and {page url: [image urls]}. refresh() drops
+    # pages whose images changed size, so the build regenerates them. Pages
+    # read img dimensions through measure() (see parse.image_props).
+    def __init__(self, path, root, images = None, sizes = None, pages = None):
+        self.path = path
+        self.root = root
+        self.images = images if images != None else {}
+        self.sizes = sizes if sizes != None else {}
+        self.pages = pages if pages != None else {}
+
+    def __repr__(self):
+        return f"ImageIndex(path={self.path}, images={len(self.images)}, pages={len(self.pages)})"
+
+    def measure(self, url):
+        # [width, height] of a local image (or None), re-hashing only when its stat changed
+        path = image_path(self.root, url)
+        if path == None:
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            self.images.pop(url, None)
+            return None
+        entry = self.images.get(url)
+        if entry == None or entry["size"] != st.st_size or entry["mtime"] != st.st_mtime_ns:
+            entry = {"size": st.st_size, "mtime": st.st_mtime_ns, "hash": file_hash(path)}
+            self.images[url] = entry
+        if entry["hash"] not in self.sizes:
+            size = read_image_size(path)
+            self.sizes[entry["hash"]] = list(size) if size != None else None
+        return self.sizes[entry["hash"]]
+
+    def refresh(self):
+        # Pages whose images changed dimensions (or disappeared) are dropped
+        urls = set(self.images)
+        for page_urls in self.pages.values():
+            urls.update(page_urls)
+        changed = set()
+        for url in urls:
+            entry = self.images.get(url)
+            before = self.sizes.get(entry["hash"]) if entry != None else None
+            if self.measure(url) != before:
+                changed.add(url)
+        for (page, urls) in list(self.pages.items()):
+            if not changed.isdisjoint(urls):
+                del self.pages[page]
+        return changed
+
+    # Page index interface used by the build (see parse.run_and_record)
+    def has_page(self, output):
+        return page_url(output) in self.pages
+
+    def update_page(self, output, info):
+        urls = sorted(set(url for url in info["images"] if image_path(self.root, url) != None))
+        for url in urls:
+            self.measure(url)
+        self.pages[page_url(output)] = urls
+
+    def remove_page(self, output):
+        self.pages.pop(page_url(output), None)
+
+    def oversized(self):
+        # [(page, url, bytes, [width, height])] for images past the report limits
+        report = []
+        for (page, urls) in sorted(self.pages.items()):
+            for url in urls:
+                entry = self.images.get(url)
+                if entry == None:
+                    continue
+                size = self.sizes.get(entry["hash"])
+                too_big = size != None and max(size) > OVERSIZED_PIXELS
+                if entry["size"] > OVERSIZED_BYTES or too_big:
+                    report.append((page, url, entry["size"], size))
+        return report
+
+    def save(self):
+        used = set()
+        for urls in self.pages.values():
+            used.update(urls)
+        images = {url: entry for (url, entry) in self.images.items() if url in used}
+        sizes = {entry["hash"]: self.sizes.get(entry["hash"]) for entry in images.values()}
+        with AtomicWriter(self.path) as f:
+            json.dump({"images": images, "sizes": sizes, "pages": self.pages}, f, indent=1, sort_keys=True)
+
+def load_images(path, root):
+    data = load_json(path, {})
+    return ImageIndex(path, root, data.get("images"), data.get("sizes"), data.get("pages"))
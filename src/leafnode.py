@@ -1,6 +1,9 @@
+from escape import escape_text
 from htmlnode import HTMLNode
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag = None, value = None, props = None):
         if value == None:
             raise ValueError("leaf node requires value")
@@ -10,6 +13,10 @@ class LeafNode(HTMLNode):
         return f"LeafNode(tag={self.tag}, value={self.value}, props={self.props})"
 
     def to_html(self):
+        # Value is text; pre-rendered HTML goes in a RawNode
         if self.tag == None:
-            return self.value
-        return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
+            return escape_text(self.value)
+        return f"<{self.tag}{self.props_to_html()}>{escape_text(self.value)}</{self.tag}>"
+
+    def iter_html(self):
+        yield self.to_html()
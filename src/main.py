@@ -1,12 +1,100 @@
+import argparse
+import os
 import pathlib
+import sys
 
-from parse import generate_pages_recursive
-from utils import dir_copy
+from compress import precompress
+from fingerprint import fingerprint_assets, remove_fingerprints
+import minify
+from parse import configure, generate_pages_recursive
+import profiler
+from utils import dir_sync
+from watch import Watcher
 
 parent_dir = pathlib.Path(__file__).parent.parent.resolve()
 from_path = f"{parent_dir}/content"
 to_path = f"{parent_dir}/public"
 template_path = f"{parent_dir}/template.html"
+static_path = f"{parent_dir}/static"
+cache_path = f"{parent_dir}/.cache"
 
-dir_copy(f"{parent_dir}/static", f"{parent_dir}/public")
-generate_pages_recursive(from_path, to_path, template_path)
+def main():
+    parser = argparse.ArgumentParser(description="Static site generator")
+    parser.add_argument(
+        "--jobs", type=int, help="Pages to generate in parallel", default=os.cpu_count() or 1
+    )
+    parser.add_argument(
+        "--checksum", action="store_true", help="Compare static files by content when their mtime differs"
+    )
+    parser.add_argument(
+        "--link", action="store_true", help="Hardlink static files into public/ instead of copying"
+    )
+    parser.add_argument(
+        "--fingerprint", action="store_true", help="Link to content-hashed copies of static files (ignored with --watch)"
+    )
+    parser.add_argument(
+        "--minify", action="store_true", help="Strip whitespace and comments from pages and CSS"
+    )
+    parser.add_argument(
+        "--no-gzip", action="store_true", help="Skip writing .gz sidecars for compressible outputs"
+    )
+    parser.add_argument(
+        "--cache-dir", type=str, help="Where rendered blocks and highlighted code are cached between builds", default=cache_path
+    )
+    parser.add_argument(
+        "--block-cache-mb", type=int, help="In-memory rendered block cache size in MB", default=64
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Render every block and highlight all code without the caches"
+    )
+    parser.add_argument(
+        "--stream-mb", type=int, help="Stream markdown files larger than this many MB", default=4
+    )
+    parser.add_argument(
+        "--profile", type=str, help="Write a Chrome trace of the build to this path", default=None
+    )
+    parser.add_argument(
+        "--profile-top", type=int, help="Slowest pages to list with --profile", default=10
+    )
+    parser.add_argument(
+        "--watch", action="store_true", help="Serve public/ and rebuild changed files in-process"
+    )
+    parser.add_argument("--port", type=int, help="Port to serve on with --watch", default=8888)
+    args = parser.parse_args()
+
+    # Local images are measured from the synced output tree
+    configure(stream_bytes=args.stream_mb * 1024 * 1024, image_root=str(to_path), minify=args.minify)
+    if not args.no_cache:
+        configure(block_cache_bytes=args.block_cache_mb * 1024 * 1024, cache_dir=args.cache_dir)
+    if args.profile != None:
+        configure(profile=True)
+
+    with profiler.span("static sync", "build"):
+        dir_sync(static_path, to_path, checksum=args.checksum, link=args.link, minify_css=args.minify)
+    # The watcher copies changed assets under their plain names, so it links to those
+    if args.fingerprint and not args.watch:
+        with profiler.span("fingerprint", "build"):
+            configure(fingerprints=fingerprint_assets(static_path, to_path, link=args.link))
+    else:
+        remove_fingerprints(to_path)
+    with profiler.span("pages", "build"):
+        generate_pages_recursive(from_path, to_path, template_path, jobs=args.jobs)
+    if not args.no_gzip:
+        with profiler.span("precompress", "build"):
+            precompress(to_path, jobs=args.jobs)
+    if args.minify:
+        print(minify.report())
+    if args.profile != None:
+        events = profiler.take_events()
+        profiler.write_trace(args.profile, events)
+        print(profiler.summarize(events, args.profile_top))
+        print(f"Wrote trace to {args.profile}")
+        configure(profile=False)
+    if args.watch:
+        sys.path.append(str(parent_dir))
+        import server
+        server.run_in_background(port=args.port, directory=to_path)
+        Watcher(from_path, static_path, template_path, to_path, link=args.link, minify_css=args.minify).run()
+
+if __name__ == "__main__":
+    main()
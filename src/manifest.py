@@ -0,0 +1,59 @@
+import hashlib
+import json
+import os
+
+MANIFEST_NAME = ".build-manifest.json"
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class Manifest:
+    # Records the inputs each output page was built from: {source: {output, source, template, version}}
+    def __init__(self, path, pages = None):
+        self.path = path
+        self.pages = pages if pages != None else {}
+
+    def __repr__(self):
+        return f"Manifest(path={self.path}, pages={len(self.pages)})"
+
+    def is_current(self, source, source_hash, template_hash, version):
+        entry = self.pages.get(source)
+        if entry == None:
+            return False
+        return (
+            entry["source"] == source_hash
+            and entry["template"] == template_hash
+            and entry["version"] == version
+        )
+
+    def record(self, source, output, source_hash, template_hash, version):
+        self.pages[source] = {
+            "output": output,
+            "source": source_hash,
+            "template": template_hash,
+            "version": version,
+        }
+
+    def remove(self, source):
+        return self.pages.pop(source, None)
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"pages": self.pages}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+def load_manifest(path):
+    if not os.path.isfile(path):
+        return Manifest(path)
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        # An unreadable manifest just means a full rebuild
+        return Manifest(path)
+    return Manifest(path, data.get("pages", {}))
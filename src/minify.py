@@ -0,0 +1,172 @@
+import bisect
+import re
+
+# Whitespace is significant inside these; their contents are passed through
+PRESERVE_REGEX = re.compile(r"<(pre|textarea|script|style)\b.*?</\1>", re.S | re.I)
+PRESERVE_OPEN_REGEX = re.compile(r"<(pre|textarea|script|style)\b", re.I)
+PRESERVE_CLOSE_REGEX = re.compile(r"</(pre|textarea|script|style)>", re.I)
+COMMENT_REGEX = re.compile(r"<!--(?!\[if).*?-->", re.S)
+# HTML's ASCII whitespace only: \s would also take non-breaking and other Unicode spaces
+SPACE = r"[ \t\n\r\f]"
+WHITESPACE_REGEX = re.compile(SPACE + "+")
+TAG_NAME_REGEX = re.compile(r"</?([!\w]+)")
+# Inside a tag: where a quoted attribute value or the tag itself ends
+TAG_DELIMITER_REGEX = re.compile(r"[\"'>]")
+# Whitespace next to these tags never renders, so it can go entirely
+BLOCK_TAGS = {
+    "!doctype", "html", "head", "body", "meta", "link", "title", "base",
+    "article", "section", "header", "footer", "main", "nav", "aside",
+    "div", "p", "h1", "h2", "h3", "h4", "h5", "h6", "ul", "ol", "li",
+    "blockquote", "pre", "hr", "table", "thead", "tbody", "tr", "td", "th",
+}
+CSS_COMMENT_REGEX = re.compile(r"/\*.*?\*/", re.S)
+# Not ":", whose leading space can matter in selectors ("a :hover")
+CSS_PUNCTUATION_REGEX = re.compile(SPACE + r"*([{};,>])" + SPACE + "*")
+CSS_COLON_REGEX = re.compile(":" + SPACE + "+")
+CSS_STRING_REGEX = re.compile(r"(\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*')")
+
+# File extension -> [bytes saved, bytes written]; pages report theirs back to the main process
+SAVINGS = {}
+
+def collapse(match):
+    return "\n" if "\n" in match.group(0) else " "
+
+def minify_html(html):
+    # Whole-text minification, used for the template at compile time: drops
+    # comments, removes whitespace next to block-level tags and collapses the
+    # rest to a single space (or newline), outside pre/textarea/script/style
+    html = COMMENT_REGEX.sub("", html)
+    preserved = [m.span() for m in PRESERVE_REGEX.finditer(html)]
+    starts = [start for (start, _) in preserved]
+
+    def replace(match):
+        i = bisect.bisect_right(starts, match.start()) - 1
+        if i >= 0 and match.start() < preserved[i][1]:
+            return match.group(0)
+        return minify_space(html, match)
+
+    return WHITESPACE_REGEX.sub(replace, html)
+
+def minify_space(text, match):
+    if "\n" in match.group(0):
+        before = text.rfind("<", 0, match.start())
+        if match.start() > 0 and text[match.start() - 1] == ">" and is_block_tag(text, before):
+            return ""
+        if is_block_tag(text, match.end()):
+            return ""
+    return collapse(match)
+
+def is_block_tag(text, pos):
+    if pos < 0 or not text.startswith("<", pos):
+        return False
+    name = TAG_NAME_REGEX.match(text, pos)
+    return name != None and name.group(1).lower() in BLOCK_TAGS
+
+class MinifyingWriter:
+    # Stream wrapper for rendered content: collapses whitespace runs in text
+    # as it is written, fragment by fragment, passing tags (and their attribute
+    # values) and pre/textarea/script/style contents through untouched. Counts
+    # what it saved.
+    def __init__(self, stream):
+        self.stream = stream
+        self.preserve = 0 # Open pre/textarea/script/style tags
+        self.space = False # Last character written was collapsed whitespace
+        self.in_tag = False # Between "<" and ">", possibly across fragments
+        self.quote = None # Quote of the attribute value being written, if any
+        self.saved = 0
+
+    def write(self, text):
+        pos = 0
+        while pos < len(text):
+            if self.preserve > 0:
+                close = PRESERVE_CLOSE_REGEX.search(text, pos)
+                end = close.end() if close != None else len(text)
+                self.stream.write(text[pos:end])
+                self.space = False
+                if close != None:
+                    self.preserve -= 1
+                pos = end
+                continue
+            start = PRESERVE_OPEN_REGEX.search(text, pos)
+            end = start.start() if start != None else len(text)
+            self.write_text(text[pos:end])
+            if start != None:
+                self.preserve += 1
+            pos = end
+        return len(text)
+
+    def write_text(self, text):
+        pos = 0
+        while pos < len(text):
+            if self.quote != None:
+                end = text.find(self.quote, pos)
+                if end >= 0:
+                    self.quote = None
+                end = end + 1 if end >= 0 else len(text)
+            elif self.in_tag:
+                delimiter = TAG_DELIMITER_REGEX.search(text, pos)
+                end = delimiter.end() if delimiter != None else len(text)
+                if delimiter != None and delimiter.group() == ">":
+                    self.in_tag = False
+                elif delimiter != None:
+                    self.quote = delimiter.group()
+            else:
+                start = text.find("<", pos)
+                end = start if start >= 0 else len(text)
+                self.write_collapsed(text[pos:end])
+                if start >= 0:
+                    self.in_tag = True
+                pos = end
+                continue
+            self.stream.write(text[pos:end])
+            self.space = False
+            pos = end
+
+    def write_collapsed(self, text):
+        if text == "":
+            return
+        minified = WHITESPACE_REGEX.sub(collapse, text)
+        if self.space and minified[0] in " \n":
+            minified = minified[1:]
+        if minified != "":
+            self.stream.write(minified)
+            self.space = minified[-1] in " \n"
+        self.saved += encoded_length(text) - encoded_length(minified)
+
+def encoded_length(text):
+    # UTF-8 bytes, as the template and CSS savings are counted; isascii() is O(1)
+    return len(text) if text.isascii() else len(text.encode("utf-8"))
+
+def minify_css(css):
+    # Comments and whitespace around punctuation go; strings are left as written
+    parts = CSS_STRING_REGEX.split(css)
+    for i in range(0, len(parts), 2):
+        text = CSS_COMMENT_REGEX.sub("", parts[i])
+        text = WHITESPACE_REGEX.sub(" ", text)
+        text = CSS_PUNCTUATION_REGEX.sub(r"\1", text)
+        parts[i] = CSS_COLON_REGEX.sub(":", text).replace(";}", "}")
+    return "".join(parts).strip(" \t\n\r\f") # Not strip(), which would take Unicode spaces too
+
+def record_savings(ext, saved, written):
+    totals = SAVINGS.setdefault(ext, [0, 0])
+    totals[0] += saved
+    totals[1] += written
+
+def take_savings():
+    savings = dict(SAVINGS)
+    SAVINGS.clear()
+    return savings
+
+def add_savings(savings):
+    for (ext, (saved, written)) in savings.items():
+        record_savings(ext, saved, written)
+
+def report():
+    if len(SAVINGS) == 0:
+        return "Minified: nothing written this build."
+    lines = ["Minified (files written this build):"]
+    for (ext, (saved, written)) in sorted(SAVINGS.items()):
+        before = saved + written
+        percent = saved / before * 100 if before > 0 else 0
+        lines.append(f"  {ext}: {saved / 1024:.1f} KB saved of {before / 1024:.1f} KB ({percent:.1f}%)")
+    return "\n".join(lines)
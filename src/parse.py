@@ -1,10 +1,39 @@
+from concurrent.futures import ProcessPoolExecutor
+import contextlib
 from enum import Enum, unique
+import hashlib
+import io
+import json
 import os 
 import re
+import traceback
 
+from cache import DiskCache, LRUCache
+from escape import escape_text
+from fingerprint import load_fingerprint_index, rewrite_url
+import highlight
+from highlight import code_language, highlight_code, highlight_version
+from images import IMAGES_NAME, ImageIndex, image_path, load_images
 from leafnode import LeafNode
+import minify
+from minify import MinifyingWriter
+from manifest import MANIFEST_NAME, file_hash, load_manifest
 from parentnode import ParentNode
+import profiler
+from rawnode import RawNode
+from references import REFERENCES_NAME, load_references
+from search import load_search_index, search_terms
+from template import load_template
 from textnode import TextNode
+from utils import AtomicWriter, ensure_dir
+
+# Bump when a parser or renderer change alters generated output
+GENERATOR_VERSION = "9"
+
+def generator_version():
+    # What cached blocks and built pages are versioned by: GENERATOR_VERSION
+    # plus the highlighter's, which covers its registered languages
+    return f"{GENERATOR_VERSION}+{highlight_version()}"
 
 class SSSyntaxError(Exception):
     pass
@@ -12,6 +41,9 @@ class SSSyntaxError(Exception):
 class SSTypeError(Exception):
     pass
 
+class SSBuildError(Exception):
+    pass
+
 @unique
 class BlockType(Enum):
     PARAGRAPH = 0
@@ -30,16 +62,26 @@ class TextType(Enum):
     LINK = 4
     IMAGE = 5
 
-MD_IMG_REGEX = r"!\[(.*?)\]\((.*?)\)"
-MD_LINK_REGEX = r"(?<!\!)\[(.*?)\]\((.*?)\)"
+TEXT_TYPES = tuple(TextType) # TextType by value, for cached inline nodes
+# Labels stop at brackets so a stray "[" can't swallow the text before a real
+# link, and URLs stop at brackets too, so a failed match scans only up to the
+# next one instead of to the end of the line (quadratic on "[a](" runs)
+MD_IMG_REGEX = r"!\[([^\[\]]*)\]\(([^\[\]\n)]*)\)"
+MD_LINK_REGEX = r"(?<!\!)\[([^\[\]]*)\]\(([^\[\]\n)]*)\)"
+HEADING_TAGS = ("h1", "h2", "h3", "h4", "h5", "h6") # Shared tag strings instead of f"h{level}" per heading
+BLOCK_SEPARATOR_REGEX = re.compile(r"\n\n+") # Blocks end at a blank line; "" lines only
+HEADING_REGEX = re.compile(r"#+ ")
+OL_REGEX = re.compile(r"(\d+)\.")
+TITLE_REGEX = re.compile(r"<h1>(.+?)<\/h1>")
+INLINE_SPECIAL_REGEX = re.compile(r"[*`\[]")
+MD_IMG_PATTERN = re.compile(MD_IMG_REGEX)
+MD_LINK_PATTERN = re.compile(MD_LINK_REGEX)
 
 def extract_markdown_images(text):
-    global MD_IMG_REGEX
-    return re.findall(MD_IMG_REGEX, text)
+    return MD_IMG_PATTERN.findall(text)
 
 def extract_markdown_links(text):
-    global MD_LINK_REGEX
-    return re.findall(MD_LINK_REGEX, text)
+    return MD_LINK_PATTERN.findall(text)
     
 def text_node_to_html_node(text_node):
     if not text_node.text_type in TextType:
@@ -56,12 +98,39 @@ def text_node_to_html_node(text_node):
         case TextType.CODE:
             return LeafNode(tag="code", value=text_node.text)
         case TextType.LINK:
-            return LeafNode(tag="a", value=text_node.text, props={"href":text_node.url})
+            return LeafNode(tag="a", value=text_node.text, props={"href": asset_url(text_node.url)})
         case TextType.IMAGE:
-            return LeafNode(tag="img", value="", props={"alt": text_node.text, "src":text_node.url})
+            return LeafNode(tag="img", value="", props=image_props(text_node.text, text_node.url))
         case _:
             raise ValueError("you f'd up")
 
+def image_props(alt, url):
+    # Local images (under the configured image_root) get their intrinsic size
+    # so the browser can reserve space, and load lazily
+    props = {"alt": alt, "src": asset_url(url)}
+    if IMAGES == None or local_image_path(url) == None:
+        return props
+    size = IMAGES.measure(url)
+    if size != None:
+        props["width"] = str(size[0])
+        props["height"] = str(size[1])
+    props["loading"] = "lazy"
+    props["decoding"] = "async"
+    return props
+
+def asset_url(url):
+    # The fingerprinted URL when the build fingerprints assets
+    fingerprints = BUILD_OPTIONS.get("fingerprints")
+    if not fingerprints:
+        return url
+    return rewrite_url(url, fingerprints)
+
+def local_image_path(url):
+    root = BUILD_OPTIONS.get("image_root")
+    if root == None:
+        return None
+    return image_path(root, url)
+
 def split_nodes_delimiter(old_nodes, delimiter, text_type):
     new_nodes = []
     for node in old_nodes:
@@ -86,216 +155,785 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
     return new_nodes
 
 def split_nodes_images(old_nodes):
-    new_nodes = []
-    for node in old_nodes:
-        imgs = extract_markdown_images(node.text)
-        if len(imgs) == 0:
-            new_nodes.append(node)
-        else:
-            text = node.text
-            for img_tuple in imgs:
-                (before, after) = text.split(f"![{img_tuple[0]}]({img_tuple[1]})", 1)
-                if before != "":
-                    new_nodes.append(TextNode(before, TextType.TEXT))
-                new_nodes.append(TextNode(img_tuple[0], TextType.IMAGE, img_tuple[1]))
-                text = after
-            if text != "":
-                new_nodes.append(TextNode(text, TextType.TEXT))
-    return new_nodes
+    return split_nodes_pattern(old_nodes, MD_IMG_PATTERN, TextType.IMAGE)
 
 def split_nodes_links(old_nodes):
+    return split_nodes_pattern(old_nodes, MD_LINK_PATTERN, TextType.LINK)
+
+def split_nodes_pattern(old_nodes, pattern, text_type):
+    # One pass per node, slicing between match positions rather than
+    # re-splitting the remaining text once per match
     new_nodes = []
     for node in old_nodes:
-        links = extract_markdown_links(node.text)
-        if len(links) == 0:
+        text = node.text
+        pos = 0
+        for match in pattern.finditer(text):
+            if match.start() > pos:
+                new_nodes.append(TextNode(text[pos:match.start()], TextType.TEXT))
+            new_nodes.append(TextNode(match.group(1), text_type, match.group(2)))
+            pos = match.end()
+        if pos == 0:
             new_nodes.append(node)
-        else:
-            text = node.text
-            for link_tuple in links:
-                (before, after) = text.split(f"[{link_tuple[0]}]({link_tuple[1]})", 1)
-                if before != "":
-                    new_nodes.append(TextNode(before, TextType.TEXT))
-                new_nodes.append(TextNode(link_tuple[0], TextType.LINK, link_tuple[1]))
-                text = after
-            if text != "":
-                new_nodes.append(TextNode(text, TextType.TEXT))
+        elif pos < len(text):
+            new_nodes.append(TextNode(text[pos:], TextType.TEXT))
     return new_nodes
 
 def text_to_textnodes(text):
-    node = TextNode(text, TextType.TEXT)
-    nodes = split_nodes_delimiter([node], "**", TextType.BOLD)
-    nodes = split_nodes_delimiter(nodes, "*", TextType.ITALIC)
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
-    nodes = split_nodes_images(nodes)
-    nodes = split_nodes_links(nodes)
-    return nodes
+    # Single left-to-right scan; emits the same nodes the split_nodes_* chain did
+    nodes = []
+    start = 0 # Start of the pending plain text
+    pos = 0
+    end = len(text)
+    while pos < end:
+        match = INLINE_SPECIAL_REGEX.search(text, pos)
+        if match == None:
+            break
+        i = match.start()
+        c = text[i]
+        if c == "[":
+            is_image = i > 0 and text[i - 1] == "!"
+            if is_image:
+                found = MD_IMG_PATTERN.match(text, i - 1)
+            else:
+                found = MD_LINK_PATTERN.match(text, i)
+            if found == None:
+                pos = i + 1
+                continue
+            literal_end = i - 1 if is_image else i
+            if literal_end > start:
+                nodes.append(TextNode(text[start:literal_end], TextType.TEXT))
+            text_type = TextType.IMAGE if is_image else TextType.LINK
+            nodes.append(TextNode(found.group(1), text_type, found.group(2)))
+            start = pos = found.end()
+            continue
 
-def markdown_to_blocks(md_text):
-    # "" element indicates the separation of blocks;
-    split_text = md_text.split("\n")
-    blocks = []
-    current_block = []
-    for s in md_text.split("\n"):
-        if s != "":
-            current_block.append(s)
+        if c == "*" and text.startswith("**", i):
+            delimiter = "**"
+            text_type = TextType.BOLD
+        elif c == "*":
+            delimiter = "*"
+            text_type = TextType.ITALIC
         else:
-            if len(current_block) > 0:
-                block_str = "\n".join(current_block)
-                blocks.append(block_str)
-                current_block.clear()
-    if len(current_block) > 0:
-        block_str = "\n".join(current_block)
-        blocks.append(block_str)
-    return blocks
+            delimiter = "`"
+            text_type = TextType.CODE
+        close = text.find(delimiter, i + len(delimiter))
+        if close == -1:
+            raise SSSyntaxError(f"invalid markdown syntax - delimiter=\"{delimiter}\"/str=\"{text}\"")
+        if i > start:
+            nodes.append(TextNode(text[start:i], TextType.TEXT))
+        inner = text[i + len(delimiter):close]
+        if inner != "":
+            if "[" in inner:
+                # Links and images inside a styled span replace it, as the split chain did
+                nodes.extend(split_nodes_links(split_nodes_images([TextNode(inner, text_type)])))
+            else:
+                nodes.append(TextNode(inner, text_type))
+        start = pos = close + len(delimiter)
 
-def block_to_block_type(block_text):
-    # print(f"BLOCKTEXT: {block_text}")
-    
-    heading_re = re.compile(r"^#+ ")
-    if bool(heading_re.match(block_text)):
-        return BlockType.HEADING
-    elif block_text.startswith("```") and block_text.endswith("```"):
+    if start < end or start == 0:
+        nodes.append(TextNode(text[start:], TextType.TEXT))
+    return nodes
+
+class Block:
+    # One markdown block: its type and its lines (block separators excluded)
+    __slots__ = ("block_type", "lines")
+
+    def __init__(self, block_type, lines):
+        self.block_type = block_type
+        self.lines = lines
+
+    def __eq__(self, value):
+        return self.block_type == value.block_type and self.lines == value.lines
+
+    def __repr__(self):
+        return f"Block({self.block_type}, {self.lines})"
+
+    def text(self):
+        return "\n".join(self.lines)
+
+def lex_blocks(lines):
+    # Splits a document on blank lines and classifies each block as it closes.
+    # Blank lines inside a fenced code block don't split it. Takes the whole
+    # text, or an iterable of lines which may keep their trailing newline (e.g.
+    # a file handle); only the block being built is held in memory.
+    if isinstance(lines, str):
+        if "```" not in lines:
+            for chunk in BLOCK_SEPARATOR_REGEX.split(lines.strip("\n")):
+                if chunk != "":
+                    block_lines = chunk.split("\n")
+                    yield Block(classify_lines(block_lines), block_lines)
+            return
+        lines = lines.split("\n")
+    current = []
+    fenced = False
+    for line in lines:
+        if line.endswith("\n"):
+            line = line[:-1]
+        if fenced:
+            current.append(line)
+            fenced = not line.endswith("```")
+        elif line != "":
+            if len(current) == 0 and opens_fence(line):
+                fenced = True
+            current.append(line)
+        elif len(current) > 0:
+            yield Block(classify_lines(current), current)
+            current = []
+    while len(current) > 0 and current[-1] == "":
+        current.pop() # An unclosed fence at the end of the file
+    if len(current) > 0:
+        yield Block(classify_lines(current), current)
+
+def opens_fence(line):
+    # "```" or "```lang" opens a fence; "```code```" is open and closed on one line
+    return line.startswith("```") and (len(line) < 6 or not line.endswith("```"))
+
+def classify_lines(lines):
+    # Dispatch on the first character; only that block type's rule is checked
+    classify = BLOCK_CLASSIFIERS.get(lines[0][:1]) # "" for an empty first line
+    if classify == None:
+        return BlockType.PARAGRAPH
+    return classify(lines)
+
+def classify_heading(lines):
+    return BlockType.HEADING if HEADING_REGEX.match(lines[0]) else BlockType.PARAGRAPH
+
+def classify_code(lines):
+    if lines[0].startswith("```") and lines[-1].endswith("```"):
         return BlockType.CODE
-    
-    spl = block_text.split("\n")
-    is_quote = True
-    for s in spl:
-        if not s.startswith(">"):
-            is_quote = False
-            break
-    if is_quote:
-        return BlockType.QUOTE
-    
-    is_ul = True
-    for s in spl:
-        if not s.startswith("* ") and not s.startswith("- "):
-            is_ul = False
-            break
-    if is_ul:
-        return BlockType.UNORDERED_LIST
-    
-    is_ol = True
-    ol_re = re.compile(r"^\d\.")
+    return BlockType.PARAGRAPH
+
+def classify_quote(lines):
+    for line in lines:
+        if not line.startswith(">"):
+            return BlockType.PARAGRAPH
+    return BlockType.QUOTE
+
+def classify_unordered_list(lines):
+    for line in lines:
+        if not line.startswith("* ") and not line.startswith("- "):
+            return BlockType.PARAGRAPH
+    return BlockType.UNORDERED_LIST
+
+def classify_ordered_list(lines):
+    # Items must be numbered 1, 2, 3, ... in order
     current_num = 1
-    for s in spl:
-        # if not a digit then "." OR the digit isn't one more than previous number
-        if not bool(ol_re.match(s)) or s[0] != f"{current_num}":
-            is_ol = False
-            break
+    for line in lines:
+        match = OL_REGEX.match(line)
+        if match == None or int(match.group(1)) != current_num:
+            return BlockType.PARAGRAPH
         current_num += 1
-    if is_ol:
-        return BlockType.ORDERED_LIST
+    return BlockType.ORDERED_LIST
 
-    return BlockType.PARAGRAPH
+BLOCK_CLASSIFIERS = {
+    "#": classify_heading,
+    "`": classify_code,
+    ">": classify_quote,
+    "*": classify_unordered_list,
+    "-": classify_unordered_list,
+    **{digit: classify_ordered_list for digit in "0123456789"},
+}
 
-def markdown_to_html_node(md_doc):
-    blocks = markdown_to_blocks(md_doc)
+def markdown_to_blocks(md_text):
+    return [block.text() for block in lex_blocks(md_text)]
+
+def block_to_block_type(block_text):
+    return classify_lines(block_text.split("\n"))
+
+class Document:
+    # Result of parsing a markdown document: the HTML tree plus metadata
+    # captured while the tree was built
+    __slots__ = ("node", "title", "links", "images", "text", "text_chars", "found_terms")
+
+    def __init__(self, node = None, title = None):
+        self.node = node
+        self.title = title # Plain text of the first h1
+        self.links = [] # Link URLs in document order
+        self.images = [] # Image URLs in document order
+        # Text, link text and image alt text not yet split into search terms:
+        # that happens once per TERMS_BATCH_CHARS rather than once per node
+        self.text = []
+        self.text_chars = 0
+        self.found_terms = set()
+
+    def __repr__(self):
+        return f"Document(title={self.title}, links={len(self.links)}, images={len(self.images)}, node={self.node})"
+
+    def add_text_nodes(self, text_nodes):
+        for node in text_nodes:
+            self.add_inline(node.text, node.text_type, node.url)
+
+    def add_inline(self, text, text_type, url):
+        self.text.append(text)
+        self.text_chars += len(text)
+        if self.text_chars >= TERMS_BATCH_CHARS:
+            self.collect_terms()
+        if text_type == TextType.LINK:
+            self.links.append(url)
+        elif text_type == TextType.IMAGE:
+            self.images.append(url)
+
+    def collect_terms(self):
+        # "\n" keeps words in neighbouring nodes apart
+        self.found_terms.update(search_terms("\n".join(self.text)))
+        self.text.clear()
+        self.text_chars = 0
+
+    def terms(self):
+        # Search terms from the text, link text and image alt text
+        self.collect_terms()
+        return self.found_terms
+
+class BlockRecord(Document):
+    # Captures one block's inline nodes so a cache hit can replay them into the page's Document
+    __slots__ = ("inline",)
+
+    def __init__(self):
+        super().__init__()
+        self.inline = []
+
+    def add_inline(self, text, text_type, url):
+        self.inline.append((text, text_type.value, url))
+
+class BlockCache:
+    # Rendered HTML per block, keyed by a hash of its type and text: an in-memory
+    # LRU bounded by size, in front of an optional on-disk store that is
+    # versioned by generator_version(). Entries are (html, h1 title, inline nodes).
+    def __init__(self, max_bytes, cache_dir = None):
+        self.memory = LRUCache(max_bytes)
+        self.disk = DiskCache(cache_dir, "blocks", generator_version()) if cache_dir != None else None
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return f"BlockCache(memory={self.memory}, disk={self.disk}, hits={self.hits}, misses={self.misses})"
+
+    def key(self, block):
+        digest = hashlib.sha1(block.block_type.name.encode("utf-8"))
+        for line in block.lines:
+            digest.update(b"\n")
+            digest.update(line.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key):
+        entry = self.memory.get(key)
+        if entry == None and self.disk != None:
+            stored = self.disk.get(key)
+            if stored != None:
+                (html, title, inline) = json.loads(stored)
+                entry = (html, title, [tuple(node) for node in inline])
+                self.memory.put(key, entry, entry_size(entry))
+        if entry == None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def put(self, key, entry):
+        self.memory.put(key, entry, entry_size(entry))
+        if self.disk != None:
+            self.disk.put(key, json.dumps(entry))
+
+    def flush(self):
+        if self.disk != None:
+            self.disk.flush()
+
+def entry_size(entry):
+    (html, title, inline) = entry
+    return len(html) + sum(len(node[0]) + len(node[2] or "") for node in inline)
+
+# Set through configure(); None means blocks are always rendered
+BLOCK_CACHE = None
+# (block_cache_bytes, cache_dir, generator_version()) BLOCK_CACHE was set up for
+CACHE_SETTINGS = None
+# Content-hash image store local image sizes are read from; None without an image_root
+IMAGES = None
+BUILD_OPTIONS = {}
+# Sources bigger than this are streamed block by block (see stream_page)
+STREAM_BYTES = 4 * 1024 * 1024
+# Text a Document buffers before splitting it into search terms
+TERMS_BATCH_CHARS = 64 * 1024
+
+def configure(**options):
+    # Per-process build settings. Page worker processes get the same options
+    # through their pool initializer.
+    global BLOCK_CACHE, CACHE_SETTINGS
+    BUILD_OPTIONS.update(options)
+    profiler.enable(BUILD_OPTIONS.get("profile", False))
+    # The caches (and their hit counters) are kept until their settings or the
+    # version their entries are keyed by change
+    settings = (BUILD_OPTIONS.get("block_cache_bytes", 0), BUILD_OPTIONS.get("cache_dir"), generator_version())
+    if settings != CACHE_SETTINGS:
+        CACHE_SETTINGS = settings
+        if BUILD_OPTIONS.get("block_cache_bytes", 0) > 0:
+            BLOCK_CACHE = BlockCache(BUILD_OPTIONS["block_cache_bytes"], BUILD_OPTIONS.get("cache_dir"))
+        else:
+            BLOCK_CACHE = None
+        highlight.configure_cache(BUILD_OPTIONS.get("cache_dir"))
+    select_images()
+
+def select_images():
+    # The build's ImageIndex (see load_page_indexes) when it covers image_root,
+    # else an in-memory one
+    global IMAGES
+    root = BUILD_OPTIONS.get("image_root")
+    images = BUILD_OPTIONS.get("images")
+    if root == None:
+        IMAGES = None
+    elif images != None and os.path.abspath(images.root) == os.path.abspath(root):
+        IMAGES = images
+    elif IMAGES == None or os.path.abspath(IMAGES.root) != os.path.abspath(root):
+        IMAGES = ImageIndex(None, root)
+
+def flush_caches():
+    if BLOCK_CACHE != None:
+        BLOCK_CACHE.flush()
+    highlight.flush_cache()
+
+def markdown_to_document(md_doc):
+    document = Document()
     children = []
-    for b in blocks:
-        match block_to_block_type(b):
-            case BlockType.PARAGRAPH:
-                children.append(create_paragraph(b))
-            case BlockType.HEADING:
-                children.append(create_heading(b))
-            case BlockType.CODE:
-                children.append(create_code(b))
-            case BlockType.QUOTE:
-                children.append(create_quote(b))
-            case BlockType.UNORDERED_LIST:
-                children.append(create_unordered_list(b))
-            case BlockType.ORDERED_LIST:
-                children.append(create_ordered_list(b))
-    return ParentNode("div", children)
-
-def create_code(block):
-    code = LeafNode("code", block[3:len(block) - 3])
+    with profiler.span("blocks"):
+        blocks = list(lex_blocks(md_doc))
+    with profiler.span("inline"):
+        for block in blocks:
+            children.append(render_block(block, document))
+    flush_caches()
+    document.node = ParentNode("div", children)
+    return document
+
+def render_block(block, document):
+    # Node for one block, served from BLOCK_CACHE when enabled
+    cache = BLOCK_CACHE
+    if cache == None:
+        return create_block(block, document)
+    key = cache.key(block)
+    entry = cache.get(key)
+    # Checked on the way out too: an entry stored by a build that didn't
+    # fingerprint or measure images has the plain URLs and no sizes
+    if entry == None or not cacheable(entry[2]):
+        record = BlockRecord()
+        html = create_block(block, record).to_html()
+        entry = (html, record.title, record.inline)
+        if cacheable(record.inline):
+            cache.put(key, entry)
+    (html, title, inline) = entry
+    for (text, type_value, url) in inline:
+        document.add_inline(text, TEXT_TYPES[type_value], url)
+    if title != None and document.title == None:
+        document.title = title
+    return RawNode(html)
+
+def cacheable(inline):
+    return not any(depends_on_assets(TEXT_TYPES[type_value], url) for (_, type_value, url) in inline)
+
+def depends_on_assets(text_type, url):
+    # Local image sizes and asset fingerprints can change without the block
+    # text changing, so blocks using them aren't cached
+    if text_type == TextType.IMAGE and local_image_path(url) != None:
+        return True
+    return text_type in (TextType.IMAGE, TextType.LINK) and asset_url(url) != url
+
+def create_block(block, document = None):
+    lines = block.lines
+    match block.block_type:
+        case BlockType.PARAGRAPH:
+            return create_paragraph(lines, document)
+        case BlockType.HEADING:
+            return create_heading(lines, document)
+        case BlockType.CODE:
+            return create_code(lines)
+        case BlockType.QUOTE:
+            return create_quote(lines, document)
+        case BlockType.UNORDERED_LIST:
+            return create_unordered_list(lines, document)
+        case BlockType.ORDERED_LIST:
+            return create_ordered_list(lines, document)
+
+def markdown_to_html_node(md_doc):
+    return markdown_to_document(md_doc).node
+
+def create_code(lines):
+    block = "\n".join(lines)
+    language = code_language(lines[0][3:]) if len(lines) > 1 else None
+    if language == None:
+        code = LeafNode("code", block[3:len(block) - 3])
+        return ParentNode("pre", [code])
+    # The info string names the language; the code starts on the next line
+    text = block[len(lines[0]):len(block) - 3]
+    props = {"class": f"language-{language}"}
+    html = highlight_code(text, language)
+    if html == None:
+        code = LeafNode("code", text, props)
+    else:
+        code = ParentNode("code", [RawNode(html)], props)
     return ParentNode("pre", [code])
 
-def create_heading(block):
+def create_heading(lines, document = None):
+    first = lines[0]
     level = 0
-    for c in block:
+    for c in first:
         if c == "#":
             level += 1
         else:
             break
-    value = block_to_node_value(block[level + 1:])
-    return LeafNode(f"h{level}", value)
+    text = first[level + 1:] if len(lines) == 1 else "\n".join(lines)[level + 1:]
+    text_nodes = text_to_textnodes(text)
+    if document != None:
+        document.add_text_nodes(text_nodes)
+        if level == 1 and document.title == None:
+            document.title = "".join(node.text for node in text_nodes)
+    tag = HEADING_TAGS[level - 1] if level <= len(HEADING_TAGS) else f"h{level}"
+    return inline_node(tag, text_nodes)
 
-def create_ordered_list(block):
+def create_ordered_list(lines, document = None):
     list_items = []
-    for line in block.split("\n"):
-        list_items.append(LeafNode("li", line[3:]))
-    
+    for line in lines:
+        # Strip "N. " whatever the width of N
+        list_items.append(LeafNode("li", line[line.index(".") + 2:]))
+    add_list_text(list_items, document)
+
     return ParentNode("ol", list_items)
 
-def create_paragraph(block):
-    value = block_to_node_value(block)
-    return LeafNode("p", value)
+def create_paragraph(lines, document = None):
+    return block_to_node("p", "\n".join(lines), document)
 
-def create_quote(block):
+def create_quote(lines, document = None):
     cleaned = []
-    for line in block.split("\n"):
+    for line in lines:
         cleaned.append(line[2:])
-    value = block_to_node_value("\n".join(cleaned))
-    return LeafNode("blockquote", value)
+    return block_to_node("blockquote", "\n".join(cleaned), document)
 
-def create_unordered_list(block):
+def create_unordered_list(lines, document = None):
     list_items = []
-    for line in block.split("\n"):
+    for line in lines:
         list_items.append(LeafNode("li", line[2:]))
-    
+    add_list_text(list_items, document)
+
     return ParentNode("ul", list_items)
 
-def block_to_node_value(block):
+def add_list_text(list_items, document):
+    # List items aren't inline-parsed; their text still goes to the document (for search)
+    if document != None:
+        for item in list_items:
+            document.add_inline(item.value, TextType.TEXT, None)
+
+def block_to_node(tag, block, document = None):
+    # Element holding a block's inline nodes; their text is escaped when rendered
+    text_nodes = text_to_textnodes(block)
+    if document != None:
+        document.add_text_nodes(text_nodes)
+    return inline_node(tag, text_nodes)
+
+def inline_node(tag, text_nodes):
+    # Inline content that parses to nothing ("``", "****") is an empty element
+    if len(text_nodes) == 0:
+        return LeafNode(tag, "")
+    return ParentNode(tag, text_nodes_to_children(text_nodes))
+
+def text_nodes_to_children(text_nodes):
+    return [text_node_to_html_node(node) for node in text_nodes]
+
+def block_to_node_value(block, document = None):
     text_nodes = text_to_textnodes(block)
-    value = ""
-    for node in text_nodes:
-        html_node = text_node_to_html_node(node)
-        value += html_node.to_html()
-    return value
+    if document != None:
+        document.add_text_nodes(text_nodes)
+    return text_nodes_to_value(text_nodes)
+
+def text_nodes_to_value(text_nodes):
+    return "".join(text_node_to_html_node(node).to_html() for node in text_nodes)
 
 def extract_title(html):
-    pattern = ".*<h1>(.+)<\/h1>.*"
+    # Rendered-HTML fallback; generate_page uses Document.title from the parse
     for block in html.split("\n"):
-        result = re.search(pattern, block)
+        result = TITLE_REGEX.search(block)
         if result != None:
             return result.group(1)
-    raise SSSyntaxError
+    raise SSSyntaxError("no <h1> found in html")
+
+def page_output_path(to_path):
+    # Pages are passed around by their .md destination; the file written is .html
+    return f"{to_path[:-3]}.html"
 
 def generate_page(from_path, to_path, template_path):
     print(f"Generating page from {from_path} to {to_path} using {template_path}")
-    # Get markdown file
-    source = open(from_path, "r")
-    md_doc = source.read()
-    source.close()
-    html_node = markdown_to_html_node(md_doc)
-    html = html_node.to_html()
-    # Get HTML template
-    template = open(template_path, "r")
-    template_html = template.read()
-    template.close()
-    # Compile template
-    compiled_html = template_html.replace("{{ Title }}", extract_title(html))
-    compiled_html = compiled_html.replace("{{ Content }}", html)
-    # Write compiled template to to_path location
-    to_dir = os.path.dirname(to_path)
-    if not os.path.exists(to_dir):
-        os.makedirs(to_dir)
-    file_name = to_path[:-3]
-    out = open(f"{file_name}.html", "w")
-    out.write(compiled_html)
-    out.close()
-
-def generate_pages_recursive(dir_path_content, dest_dir_path, template_path):
+    with profiler.span("page", "page", page=from_path):
+        template = page_template(template_path)
+        ensure_dir(os.path.dirname(to_path))
+        if os.path.getsize(from_path) > BUILD_OPTIONS.get("stream_bytes", STREAM_BYTES):
+            return stream_page(from_path, page_output_path(to_path), template)
+        # Get markdown file
+        with profiler.span("read"):
+            source = open(from_path, "r")
+            md_doc = source.read()
+            source.close()
+        document = markdown_to_document(md_doc)
+        if document.title == None:
+            raise SSSyntaxError(f"no title: {from_path} has no level 1 heading (\"# Title\")")
+        if profiler.ENABLED:
+            write_page_profiled(page_output_path(to_path), template, document)
+            return document
+        # Stream the compiled template to to_path location; identical output
+        # leaves the existing page and its mtime untouched
+        output_path = page_output_path(to_path)
+        with AtomicWriter(output_path, skip_unchanged=True) as out:
+            saved = render_page(out, template, document.title, document.node.write_html)
+        record_minified(output_path, saved)
+    return document
+
+def page_template(template_path):
+    return load_template(template_path, BUILD_OPTIONS.get("fingerprints"), BUILD_OPTIONS.get("minify", False))
+
+def render_page(stream, template, title, content):
+    # Renders the template around a page's content (a string, or a callable
+    # that writes itself). With minify, the content is minified as it streams
+    # through; returns the bytes that saved, template included.
+    if not BUILD_OPTIONS.get("minify", False):
+        template.render(stream, {"Title": escape_text(title), "Content": content})
+        return 0
+    writer = MinifyingWriter(stream)
+    if callable(content):
+        write_content = lambda stream: content(writer)
+    else:
+        write_content = lambda stream: writer.write(content)
+    template.render(stream, {"Title": escape_text(title), "Content": write_content})
+    return template.saved + writer.saved
+
+def record_minified(output_path, saved):
+    if BUILD_OPTIONS.get("minify", False):
+        minify.record_savings(".html", saved, os.path.getsize(output_path))
+
+def stream_page(from_path, output_path, template):
+    # Bounded-memory generate_page for very large sources: blocks are lexed off
+    # the file handle and rendered straight into the output, so only the
+    # largest block (and the blocks before the title) is held at once.
+    # The returned Document has no node; its metadata is complete.
+    document = Document()
+    with open(from_path, "r") as source:
+        blocks = lex_blocks(source)
+        head = []
+        with profiler.span("inline"):
+            for block in blocks:
+                head.append(render_block(block, document))
+                if document.title != None:
+                    break
+        if document.title == None:
+            raise SSSyntaxError(f"no title: {from_path} has no level 1 heading (\"# Title\")")
+
+        def write_content(stream):
+            # Same markup as markdown_to_document's wrapping div
+            stream.write("<div>")
+            for node in head:
+                node.write_html(stream)
+            head.clear()
+            for block in blocks:
+                render_block(block, document).write_html(stream)
+            stream.write("</div>")
+
+        with profiler.span("write"):
+            with AtomicWriter(output_path, skip_unchanged=True) as out:
+                saved = render_page(out, template, document.title, write_content)
+    record_minified(output_path, saved)
+    flush_caches()
+    return document
+
+def write_page_profiled(output_path, template, document):
+    # Streaming interleaves rendering, templating and I/O; when profiling,
+    # do them one after another so each stage gets its own span
+    with profiler.span("render"):
+        html = document.node.to_html()
+    with profiler.span("template"):
+        page = io.StringIO()
+        saved = render_page(page, template, document.title, html)
+    with profiler.span("write"):
+        with AtomicWriter(output_path, skip_unchanged=True) as out:
+            out.write(page.getvalue())
+    record_minified(output_path, saved)
+
+def find_pages(dir_path_content, dest_dir_path):
+    # Yields (markdown path, destination path) for every page under dir_path_content.
+    # scandir entries carry their type, so this needs no stat call per file.
+    with os.scandir(dir_path_content) as it:
+        entries = sorted(it, key=lambda entry: entry.name)
+    for entry in entries:
+        to_path = os.path.join(dest_dir_path, entry.name)
+        if entry.name.endswith(".md") and entry.is_file():
+            yield (entry.path, to_path)
+        elif entry.is_dir():
+            yield from find_pages(entry.path, to_path)
+
+def page_info(document):
+    # The picklable part of a Document that page indexes are fed from
+    return {
+        "title": document.title,
+        "links": document.links,
+        "images": document.images,
+        "terms": sorted(document.terms()),
+    }
+
+def run_page_job(job):
+    # Runs one generate_page call, capturing its log so callers can print in job
+    # order. Profiler events and minify savings travel back with the result.
+    log = io.StringIO()
+    error = None
+    info = None
+    with contextlib.redirect_stdout(log):
+        try:
+            info = page_info(generate_page(*job))
+        except Exception:
+            error = traceback.format_exc()
+    events = profiler.take_events() if profiler.ENABLED else None
+    return (log.getvalue(), error, info, events, minify.take_savings())
+
+def apply_options(options):
+    configure(**options)
+
+def run_page_jobs(jobs, workers):
+    # Yields (job, log, error, info, events, savings) in job order, on a process pool when workers > 1
+    if workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            yield (job, *run_page_job(job))
+        return
+    workers = min(workers, len(jobs))
+    chunksize = max(1, len(jobs) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=apply_options, initargs=(dict(BUILD_OPTIONS),)) as executor:
+        for (job, result) in zip(jobs, executor.map(run_page_job, jobs, chunksize=chunksize)):
+            yield (job, *result)
+
+def page_record(dir_path_content, dest_dir_path, from_path):
+    # (source, to_path, output) for a markdown file, relative where stored in the manifest
+    source = os.path.relpath(from_path, dir_path_content)
+    to_path = os.path.join(dest_dir_path, source)
+    output = os.path.relpath(page_output_path(to_path), dest_dir_path)
+    return (source, to_path, output)
+
+def load_page_indexes(dest_dir_path):
+    # Site-wide indexes fed from each built page's info. Each one has
+    # has_page(output), update_page(output, info), remove_page(output) and save().
+    # The image and fingerprint indexes drop pages whose images changed size or
+    # whose assets got new fingerprints, so they get rebuilt
+    images = load_images(os.path.join(dest_dir_path, IMAGES_NAME), dest_dir_path)
+    images.refresh()
+    # Pages are rendered against the same store (workers get a copy with their options)
+    configure(images=images)
+    fingerprints = load_fingerprint_index(dest_dir_path, BUILD_OPTIONS.get("fingerprints", {}))
+    fingerprints.refresh()
+    return [
+        load_references(os.path.join(dest_dir_path, REFERENCES_NAME)),
+        load_search_index(dest_dir_path),
+        images,
+        fingerprints,
+    ]
+
+def run_and_record(pending, records, manifest, template_hash, jobs, indexes = ()):
+    # Runs page jobs, records the successful ones in the manifest and page
+    # indexes, returns failed sources
+    failures = []
+    version = generator_version()
+    for (job, log, error, info, events, savings) in run_page_jobs(pending, jobs):
+        print(log, end="")
+        if events != None:
+            profiler.add_events(events)
+        minify.add_savings(savings)
+        if error != None:
+            print(f"Failed to generate {job[0]}:\n{error}", end="")
+            failures.append(job[0])
+            continue
+        (source, output, source_hash) = records[job[0]]
+        manifest.record(source, output, source_hash, template_hash, version)
+        for index in indexes:
+            index.update_page(output, info)
+    return failures
+
+def remove_pages(sources, manifest, dest_dir_path, indexes = ()):
+    for source in sorted(sources):
+        entry = manifest.remove(source)
+        if entry == None:
+            continue
+        for index in indexes:
+            index.remove_page(entry["output"])
+        output_path = os.path.join(dest_dir_path, entry["output"])
+        if os.path.isfile(output_path):
+            print(f"Removing {output_path} (source deleted)")
+            os.remove(output_path)
+
+def generate_pages_recursive(dir_path_content, dest_dir_path, template_path, jobs = 1):
     if not os.path.isdir(dir_path_content):
         raise Exception(f"source path is not a directory: {dir_path_content}")
-    dir_list = os.listdir(dir_path_content)
-    if len(dir_list) == 0:
-        return
-    for entry in dir_list:
-        if os.path.isfile(os.path.join(dir_path_content, entry)) and entry.endswith(".md"):
-            generate_page(os.path.join(dir_path_content, entry), os.path.join(dest_dir_path, entry), template_path)
-        elif os.path.isdir(os.path.join(dir_path_content, entry)):
+    os.makedirs(dest_dir_path, exist_ok=True)
+    manifest = load_manifest(os.path.join(dest_dir_path, MANIFEST_NAME))
+    template_hash = page_template(template_path).digest
+    indexes = load_page_indexes(dest_dir_path)
+    version = generator_version()
+    seen = set()
+    pending = []
+    records = {}
+    skipped = 0
+    for (from_path, to_path) in find_pages(dir_path_content, dest_dir_path):
+        source = os.path.relpath(from_path, dir_path_content)
+        output = os.path.relpath(page_output_path(to_path), dest_dir_path)
+        seen.add(source)
+        source_hash = file_hash(from_path)
+        if (
+            manifest.is_current(source, source_hash, template_hash, version)
+            and os.path.isfile(os.path.join(dest_dir_path, output))
+            and all(index.has_page(output) for index in indexes)
+        ):
+            skipped += 1
+            continue
+        pending.append((from_path, to_path, template_path))
+        records[from_path] = (source, output, source_hash)
 
-            generate_pages_recursive(os.path.join(dir_path_content, entry), os.path.join(dest_dir_path, entry), template_path)
+    failures = run_and_record(pending, records, manifest, template_hash, jobs, indexes)
+    # Drop outputs whose markdown source was deleted
+    remove_pages(set(manifest.pages) - seen, manifest, dest_dir_path, indexes)
+    manifest.save()
+    for index in indexes:
+        index.save()
+    report_broken_references(indexes[0], dest_dir_path)
+    report_oversized_images(indexes[2])
+    if skipped > 0:
+        print(f"Skipped {skipped} unchanged pages.")
+    if len(failures) > 0:
+        raise SSBuildError(f"{len(failures)} page(s) failed: {', '.join(failures)}")
     print("Done.")
+
+def generate_changed_pages(dir_path_content, dest_dir_path, template_path, changed, removed):
+    # Watch-mode entry point: rebuilds only the given markdown files (no tree walk
+    # or re-hashing of the rest) and keeps the manifest in step. Returns failures.
+    manifest = load_manifest(os.path.join(dest_dir_path, MANIFEST_NAME))
+    template_hash = page_template(template_path).digest
+    indexes = load_page_indexes(dest_dir_path)
+    pending = []
+    records = {}
+    for from_path in changed:
+        (source, to_path, output) = page_record(dir_path_content, dest_dir_path, from_path)
+        pending.append((from_path, to_path, template_path))
+        records[from_path] = (source, output, file_hash(from_path))
+    failures = run_and_record(pending, records, manifest, template_hash, 1, indexes)
+    remove_pages(
+        [page_record(dir_path_content, dest_dir_path, p)[0] for p in removed],
+        manifest,
+        dest_dir_path,
+        indexes,
+    )
+    manifest.save()
+    for index in indexes:
+        index.save()
+    report_broken_references(indexes[0], dest_dir_path)
+    report_oversized_images(indexes[2])
+    return failures
+
+def report_broken_references(references, dest_dir_path):
+    # Checked against the reference index and the output tree; no re-parsing
+    broken = references.broken(dest_dir_path)
+    for (page, target) in broken:
+        print(f"Broken reference on {page}: {target}")
+    return broken
+
+def report_oversized_images(images):
+    oversized = images.oversized()
+    for (page, url, size, dimensions) in oversized:
+        shape = f", {dimensions[0]}x{dimensions[1]}" if dimensions != None else ""
+        print(f"Oversized image on {page}: {url} ({size / 1024:.0f} KB{shape})")
+    return oversized
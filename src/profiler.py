@@ -0,0 +1,81 @@
+import json
+import os
+import threading
+import time
+
+# Off unless enable() is called; span() then costs one global check
+ENABLED = False
+EVENTS = []
+
+class NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+NULL_SPAN = NullSpan()
+
+class Span:
+    # Records one Chrome trace "complete" event (ph "X") when it exits
+    def __init__(self, name, cat, args):
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        end = time.perf_counter_ns()
+        EVENTS.append({
+            "name": self.name,
+            "cat": self.cat,
+            "ph": "X",
+            "ts": self.start / 1000,
+            "dur": (end - self.start) / 1000,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": self.args,
+        })
+        return False
+
+def span(name, cat = "stage", **args):
+    if not ENABLED:
+        return NULL_SPAN
+    return Span(name, cat, args)
+
+def enable(enabled = True):
+    global ENABLED
+    ENABLED = enabled
+
+def take_events():
+    # Hands over and clears this process' events (worker processes return them with each page)
+    events = EVENTS[:]
+    EVENTS.clear()
+    return events
+
+def add_events(events):
+    EVENTS.extend(events)
+
+def write_trace(path, events):
+    # Chrome trace-event JSON; open in chrome://tracing or ui.perfetto.dev
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+def summarize(events, top = 10):
+    pages = sorted((e for e in events if e["cat"] == "page"), key=lambda e: e["dur"], reverse=True)
+    stages = {}
+    for e in events:
+        if e["cat"] == "stage":
+            (count, total) = stages.get(e["name"], (0, 0))
+            stages[e["name"]] = (count + 1, total + e["dur"])
+    lines = [f"Slowest {min(top, len(pages))} of {len(pages)} pages:"]
+    for e in pages[:top]:
+        lines.append(f"  {e['dur'] / 1000:9.2f} ms  {e['args'].get('page', e['name'])}")
+    lines.append("Stage totals:")
+    for (name, (count, total)) in sorted(stages.items(), key=lambda item: item[1][1], reverse=True):
+        lines.append(f"  {total / 1000:9.2f} ms  {name} ({count}x)")
+    return "\n".join(lines)
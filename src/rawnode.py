@@ -0,0 +1,19 @@
+from htmlnode import HTMLNode
+
+class RawNode(HTMLNode):
+    # Already-rendered HTML (e.g. a cached block), written out as is
+    __slots__ = ()
+
+    def __init__(self, html):
+        if html == None:
+            raise ValueError("raw node requires html")
+        super().__init__(None, html, None, None)
+
+    def __repr__(self):
+        return f"RawNode(html={self.value})"
+
+    def to_html(self):
+        return self.value
+
+    def iter_html(self):
+        yield self.value
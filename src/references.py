@@ -0,0 +1,103 @@
+import json
+import os
+import posixpath
+import urllib.parse
+
+from utils import AtomicWriter, load_json
+
+REFERENCES_NAME = ".references.json"
+
+def page_url(output):
+    # Output path relative to the site root -> the URL it's served at
+    url = "/" + output.replace(os.sep, "/")
+    if url.endswith("/index.html"):
+        return url[:-len("index.html")]
+    return url
+
+def resolve_url(page, url):
+    # Site-absolute path for an internal reference, None for external ones
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme != "" or parts.netloc != "" or parts.path == "":
+        return None
+    path = urllib.parse.unquote(parts.path)
+    if not path.startswith("/"):
+        path = posixpath.join(posixpath.dirname(page), path)
+    resolved = posixpath.normpath(path)
+    if path.endswith("/") and resolved != "/":
+        resolved += "/"
+    return resolved
+
+def target_exists(dest_dir, target):
+    path = os.path.join(dest_dir, target.lstrip("/"))
+    if os.path.isdir(path):
+        return os.path.isfile(os.path.join(path, "index.html"))
+    return os.path.isfile(path)
+
+class ReferenceIndex:
+    # Site-wide record of what each page references: {page url: {links, assets}}
+    # plus the reverse mapping {target: [page urls]}
+    def __init__(self, path, pages = None):
+        self.path = path
+        self.pages = pages if pages != None else {}
+
+    def __repr__(self):
+        return f"ReferenceIndex(path={self.path}, pages={len(self.pages)})"
+
+    def update(self, page, links, images):
+        resolved_links = set()
+        for url in links:
+            target = resolve_url(page, url)
+            if target != None:
+                resolved_links.add(target)
+        assets = set()
+        for url in images:
+            target = resolve_url(page, url)
+            if target != None:
+                assets.add(target)
+        self.pages[page] = {"links": sorted(resolved_links), "assets": sorted(assets)}
+
+    def remove(self, page):
+        return self.pages.pop(page, None)
+
+    # Page index interface used by the build (see parse.run_and_record)
+    def has_page(self, output):
+        return page_url(output) in self.pages
+
+    def update_page(self, output, info):
+        self.update(page_url(output), info["links"], info["images"])
+
+    def remove_page(self, output):
+        self.remove(page_url(output))
+
+    def referenced_by(self):
+        reverse = {}
+        for (page, entry) in self.pages.items():
+            for target in entry["links"] + entry["assets"]:
+                reverse.setdefault(target, set()).add(page)
+        return {target: sorted(pages) for (target, pages) in reverse.items()}
+
+    def pages_using(self, target):
+        return sorted(
+            page for (page, entry) in self.pages.items()
+            if target in entry["links"] or target in entry["assets"]
+        )
+
+    def broken(self, dest_dir):
+        # [(page, target)] for internal references that resolve to nothing in dest_dir
+        broken = []
+        for (target, pages) in sorted(self.referenced_by().items()):
+            if not target_exists(dest_dir, target):
+                broken.extend((page, target) for page in pages)
+        return sorted(broken)
+
+    def save(self):
+        with AtomicWriter(self.path) as f:
+            json.dump(
+                {"pages": self.pages, "referenced_by": self.referenced_by()},
+                f,
+                indent=1,
+                sort_keys=True,
+            )
+
+def load_references(path):
+    return ReferenceIndex(path, load_json(path, {}).get("pages", {}))
@@ -0,0 +1,136 @@
+import json
+import os
+import re
+
+from references import page_url
+from utils import AtomicWriter, ensure_dir, load_json
+
+# Served to clients: <dest>/search/pages.json and <dest>/search/terms/<shard>.json
+SEARCH_DIR = "search"
+# Build-side forward index {output: {id, title, url, terms}} used for incremental updates
+SEARCH_FORWARD_NAME = ".search-forward.json"
+TERM_REGEX = re.compile(r"\w+")
+MIN_TERM_LENGTH = 2
+SHARD_PREFIX_LENGTH = 2
+
+def search_terms(text):
+    return set(term for term in TERM_REGEX.findall(text.lower()) if len(term) >= MIN_TERM_LENGTH)
+
+def shard_name(term):
+    # Terms are sharded by their first characters; anything that wouldn't make
+    # a plain file name shares the "_" shard
+    prefix = term[:SHARD_PREFIX_LENGTH]
+    if prefix.isascii() and prefix.isalnum():
+        return prefix
+    return "_"
+
+class SearchIndex:
+    # Inverted index {term: page ids} plus a page table [[title, url], ...],
+    # written as one JSON file per term shard so clients fetch only what a query
+    # needs. Kept in step page by page; save() rewrites only the touched shards.
+    def __init__(self, dest_dir, forward = None):
+        self.dest_dir = dest_dir
+        self.forward = forward if forward != None else {}
+        self.postings = {}
+        self.dirty_shards = set()
+        ids = set()
+        for entry in self.forward.values():
+            ids.add(entry["id"])
+            for term in entry["terms"]:
+                self.postings.setdefault(term, set()).add(entry["id"])
+        self.next_id = max(ids) + 1 if len(ids) > 0 else 0
+        self.free_ids = sorted(set(range(self.next_id)) - ids, reverse=True)
+
+    def __repr__(self):
+        return f"SearchIndex(dest_dir={self.dest_dir}, pages={len(self.forward)}, terms={len(self.postings)})"
+
+    def allocate_id(self):
+        if len(self.free_ids) > 0:
+            return self.free_ids.pop()
+        self.next_id += 1
+        return self.next_id - 1
+
+    def remove_terms(self, page_id, terms):
+        for term in terms:
+            ids = self.postings.get(term)
+            if ids == None:
+                continue
+            ids.discard(page_id)
+            if len(ids) == 0:
+                del self.postings[term]
+            self.dirty_shards.add(shard_name(term))
+
+    # Page index interface used by the build (see parse.run_and_record)
+    def has_page(self, output):
+        return output in self.forward
+
+    def update_page(self, output, info):
+        terms = set(info["terms"])
+        if info["title"] != None:
+            terms.update(search_terms(info["title"]))
+        old = self.forward.get(output)
+        if old != None:
+            page_id = old["id"]
+            self.remove_terms(page_id, set(old["terms"]) - terms)
+            added = terms - set(old["terms"])
+        else:
+            page_id = self.allocate_id()
+            added = terms
+        for term in added:
+            self.postings.setdefault(term, set()).add(page_id)
+            self.dirty_shards.add(shard_name(term))
+        self.forward[output] = {
+            "id": page_id,
+            "title": info["title"],
+            "url": page_url(output),
+            "terms": sorted(terms),
+        }
+
+    def remove_page(self, output):
+        entry = self.forward.pop(output, None)
+        if entry == None:
+            return
+        self.remove_terms(entry["id"], entry["terms"])
+        self.free_ids.append(entry["id"])
+        self.free_ids.sort(reverse=True)
+
+    def search(self, query):
+        # Page urls containing every query term; what a client does with the shards
+        ids = None
+        for term in search_terms(query):
+            matches = self.postings.get(term, set())
+            ids = matches if ids == None else ids & matches
+        if ids == None:
+            return []
+        urls = {entry["id"]: entry["url"] for entry in self.forward.values()}
+        return sorted(urls[page_id] for page_id in ids)
+
+    def save(self):
+        search_dir = os.path.join(self.dest_dir, SEARCH_DIR)
+        terms_dir = os.path.join(search_dir, "terms")
+        ensure_dir(terms_dir)
+        table = [None] * self.next_id
+        for entry in self.forward.values():
+            table[entry["id"]] = [entry["title"], entry["url"]]
+        with AtomicWriter(os.path.join(search_dir, "pages.json"), skip_unchanged=True) as f:
+            json.dump({"pages": table, "shard_prefix": SHARD_PREFIX_LENGTH}, f, separators=(",", ":"))
+        shards = {}
+        for (term, ids) in self.postings.items():
+            name = shard_name(term)
+            if name in self.dirty_shards:
+                shards.setdefault(name, {})[term] = sorted(ids)
+        for name in sorted(self.dirty_shards):
+            path = os.path.join(terms_dir, f"{name}.json")
+            if name not in shards:
+                if os.path.isfile(path):
+                    os.remove(path)
+                continue
+            with AtomicWriter(path, skip_unchanged=True) as f:
+                json.dump(shards[name], f, separators=(",", ":"), sort_keys=True)
+        self.dirty_shards.clear()
+        with AtomicWriter(os.path.join(self.dest_dir, SEARCH_FORWARD_NAME)) as f:
+            json.dump({"pages": self.forward}, f, separators=(",", ":"), sort_keys=True)
+
+def load_search_index(dest_dir):
+    forward = load_json(os.path.join(dest_dir, SEARCH_FORWARD_NAME), {}).get("pages", {})
+    return SearchIndex(dest_dir, forward)
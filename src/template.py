@@ -0,0 +1,67 @@
+import hashlib
+import os
+import re
+
+from fingerprint import rewrite_url
+from minify import minify_html
+
+SLOT_REGEX = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+URL_ATTR_REGEX = re.compile(r"""\b(href|src)=(["'])(.*?)\2""")
+
+# path -> (mtime_ns, urls, minify, Template); one compile per template per process
+_template_cache = {}
+
+class Template:
+    # urls maps asset URLs to fingerprinted ones; href/src attributes in the
+    # template text are rewritten with it before compiling. With minify, the
+    # text is minified once here and saved counts the bytes that took.
+    def __init__(self, text, path = None, urls = None, minify = False):
+        self.path = path
+        self.saved = 0
+        if urls:
+            text = URL_ATTR_REGEX.sub(
+                lambda m: f"{m.group(1)}={m.group(2)}{rewrite_url(m.group(3), urls)}{m.group(2)}",
+                text,
+            )
+        if minify:
+            minified = minify_html(text)
+            self.saved = len(text.encode("utf-8")) - len(minified.encode("utf-8"))
+            text = minified
+        self.digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        # Literal text followed by the slot after it: [(literal, name, placeholder), ...]
+        self.parts = []
+        pos = 0
+        for match in SLOT_REGEX.finditer(text):
+            self.parts.append((text[pos:match.start()], match.group(1), match.group(0)))
+            pos = match.end()
+        self.parts.append((text[pos:], None, None))
+        self.slots = set(part[1] for part in self.parts if part[1] != None)
+
+    def __repr__(self):
+        return f"Template(path={self.path}, slots={sorted(self.slots)})"
+
+    def render(self, stream, values):
+        # Values are strings, or callables that write themselves to the stream.
+        # Slots without a value are left as written in the template.
+        write = stream.write
+        for (literal, name, placeholder) in self.parts:
+            write(literal)
+            if name == None:
+                continue
+            value = values.get(name)
+            if value == None:
+                write(placeholder)
+            elif callable(value):
+                value(stream)
+            else:
+                write(value)
+
+def load_template(path, urls = None, minify = False):
+    mtime = os.stat(path).st_mtime_ns
+    cached = _template_cache.get(path)
+    if cached != None and cached[0] == mtime and cached[1] == urls and cached[2] == minify:
+        return cached[3]
+    with open(path, "r") as f:
+        template = Template(f.read(), path, urls, minify)
+    _template_cache[path] = (mtime, urls, minify, template)
+    return template
@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+
+import cache
+import parse
+from cache import DiskCache, LRUCache
+from parse import configure, markdown_to_document
+
+MD = "# Title with [home](/)\n\nFirst *paragraph*.\n\n![img](/a.png)\n\n- li 1\n- li 2"
+
+class TestCache(unittest.TestCase):
+    def tearDown(self):
+        configure(block_cache_bytes=0, cache_dir=None)
+
+    def test_lru_cache(self):
+        cache = LRUCache(10)
+        cache.put("a", "aaaa", 4)
+        cache.put("b", "bbbb", 4)
+        cache.get("a")
+        cache.put("c", "cccc", 4)
+        self.assertEqual(cache.get("b"), None)
+        self.assertEqual(cache.get("a"), "aaaa")
+        cache.put("huge", "x" * 11, 11)
+        self.assertEqual(cache.get("huge"), None)
+
+    def test_disk_cache_versions(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = DiskCache(tmp, "blocks", "1")
+            cache.put("k", "v")
+            cache.flush()
+            self.assertEqual(DiskCache(tmp, "blocks", "1").get("k"), "v")
+            self.assertEqual(DiskCache(tmp, "blocks", "2").get("k"), None)
+            self.assertEqual(sorted(os.listdir(tmp))[0], "blocks-v2.sqlite")
+            self.assertFalse(any(name.startswith("blocks-v1") for name in os.listdir(tmp)))
+
+    def test_disk_cache_batches(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            writer = DiskCache(tmp, "blocks", "1")
+            reader = DiskCache(tmp, "blocks", "1")
+            writer.put("k", "v")
+            self.assertEqual(writer.get("k"), "v")
+            # Nothing written (nor locked) until the batch fills or is flushed
+            self.assertFalse(writer.connect().in_transaction)
+            self.assertEqual(reader.get("k"), None)
+            for i in range(cache.DISK_CACHE_BATCH - 1):
+                writer.put(str(i), "x")
+            self.assertEqual(writer.pending, {})
+            self.assertFalse(writer.connect().in_transaction)
+            self.assertEqual(reader.get("k"), "v")
+
+    def test_block_cache(self):
+        expected = markdown_to_document(MD)
+        with tempfile.TemporaryDirectory() as tmp:
+            configure(block_cache_bytes=1024 * 1024, cache_dir=tmp)
+            for _ in range(2):
+                document = markdown_to_document(MD)
+                self.assertEqual(document.node.to_html(), expected.node.to_html())
+                self.assertEqual(document.title, "Title with home")
+                self.assertEqual(document.links, ["/"])
+                self.assertEqual(document.images, ["/a.png"])
+            self.assertEqual((parse.BLOCK_CACHE.misses, parse.BLOCK_CACHE.hits), (4, 4))
+            # Same settings: the caches are kept
+            configure(block_cache_bytes=1024 * 1024, cache_dir=tmp)
+            self.assertEqual((parse.BLOCK_CACHE.misses, parse.BLOCK_CACHE.hits), (4, 4))
+            # Only the edited block is rendered again, also from a fresh process' view
+            parse.flush_caches()
+            configure(block_cache_bytes=0, cache_dir=None)
+            configure(block_cache_bytes=1024 * 1024, cache_dir=tmp)
+            document = markdown_to_document(MD.replace("First", "Edited"))
+            self.assertIn("<p>Edited <i>paragraph</i>.</p>", document.node.to_html())
+            self.assertEqual((parse.BLOCK_CACHE.misses, parse.BLOCK_CACHE.hits), (1, 3))
+
+    def test_block_cache_and_fingerprints(self):
+        md = "[the stylesheet](/index.css)"
+        with tempfile.TemporaryDirectory() as tmp:
+            configure(block_cache_bytes=1024 * 1024, cache_dir=tmp, fingerprints={})
+            self.assertIn("href=\"/index.css\"", markdown_to_document(md).node.to_html())
+            # An entry cached by a plain build isn't served to a fingerprinting one
+            configure(fingerprints={"/index.css": "/index.0123456789.css"})
+            self.assertIn("href=\"/index.0123456789.css\"", markdown_to_document(md).node.to_html())
+            configure(fingerprints={})
+            self.assertIn("href=\"/index.css\"", markdown_to_document(md).node.to_html())
+
+if __name__ == "__main__":
+    unittest.main()
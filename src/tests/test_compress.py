@@ -0,0 +1,52 @@
+import contextlib
+import gzip
+import io
+import os
+import tempfile
+import unittest
+
+from compress import precompress
+
+class TestPrecompress(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.write("index.html", "<p>" + "hello " * 200 + "</p>")
+        self.write("tiny.txt", "a")
+        self.write("image.png", "not compressible by extension")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, text):
+        with open(os.path.join(self.root, name), "w") as f:
+            f.write(text)
+
+    def precompress(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return precompress(self.root, jobs=2)
+
+    def test_sidecars(self):
+        self.assertEqual(self.precompress(), 1)
+        with gzip.open(os.path.join(self.root, "index.html.gz"), "rt") as f:
+            self.assertEqual(f.read(), "<p>" + "hello " * 200 + "</p>")
+        # Not smaller than the source, or not a compressible type
+        self.assertFalse(os.path.exists(os.path.join(self.root, "tiny.txt.gz")))
+        self.assertFalse(os.path.exists(os.path.join(self.root, "image.png.gz")))
+
+    def test_up_to_date_and_stale_sidecars(self):
+        self.precompress()
+        self.assertEqual(self.precompress(), 0)
+        self.write("index.html", "<p>" + "changed " * 200 + "</p>")
+        self.assertEqual(self.precompress(), 1)
+        os.remove(os.path.join(self.root, "index.html"))
+        self.precompress()
+        self.assertFalse(os.path.exists(os.path.join(self.root, "index.html.gz")))
+
+    def test_gz_assets_are_kept(self):
+        self.write("data.tar.gz", "an archive, not a sidecar")
+        self.precompress()
+        self.assertTrue(os.path.exists(os.path.join(self.root, "data.tar.gz")))
+
+if __name__ == "__main__":
+    unittest.main()
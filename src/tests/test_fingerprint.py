@@ -0,0 +1,70 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from fingerprint import FingerprintIndex, fingerprint_assets, remove_fingerprints, rewrite_url
+from template import Template
+from utils import dir_sync
+
+class TestFingerprint(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tmp.name, "static")
+        self.dst = os.path.join(self.tmp.name, "public")
+        os.makedirs(os.path.join(self.src, "images"))
+        self.write(os.path.join(self.src, "index.css"), "body {}")
+        self.write(os.path.join(self.src, "images", "a.png"), "png")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def fingerprint(self):
+        with contextlib.redirect_stdout(io.StringIO()) as log:
+            dir_sync(self.src, self.dst)
+            urls = fingerprint_assets(self.src, self.dst)
+        return (urls, log.getvalue())
+
+    def test_fingerprint_assets(self):
+        (urls, log) = self.fingerprint()
+        self.assertIn("2 hashed, 0 unchanged", log)
+        css = urls["/index.css"]
+        self.assertRegex(css, r"^/index\.[0-9a-f]{10}\.css$")
+        self.assertTrue(os.path.isfile(os.path.join(self.dst, css[1:])))
+        (_, log) = self.fingerprint()
+        self.assertIn("0 hashed, 2 unchanged, 0 removed", log)
+        self.write(os.path.join(self.src, "index.css"), "body { color: red; }")
+        (urls, log) = self.fingerprint()
+        self.assertIn("1 hashed, 1 unchanged, 1 removed", log)
+        self.assertNotEqual(urls["/index.css"], css)
+        self.assertFalse(os.path.exists(os.path.join(self.dst, css[1:])))
+        remove_fingerprints(self.dst)
+        self.assertEqual(sorted(os.listdir(os.path.join(self.dst, "images"))), ["a.png"])
+        self.assertNotIn(css[1:], os.listdir(self.dst))
+
+    def test_rewrite(self):
+        urls = {"/index.css": "/index.0123456789.css"}
+        self.assertEqual(rewrite_url("/index.css?v=1", urls), "/index.0123456789.css?v=1")
+        self.assertEqual(rewrite_url("index.css", urls), "index.css")
+        template = Template("<link href=\"/index.css\"><a href='/index.css#x'>{{ Title }}</a>", urls=urls)
+        page = io.StringIO()
+        template.render(page, {"Title": "t"})
+        self.assertEqual(page.getvalue(), "<link href=\"/index.0123456789.css\"><a href='/index.0123456789.css#x'>t</a>")
+
+    def test_index_refresh(self):
+        index = FingerprintIndex(None, {"/a.png": "/a.0123456789.png"})
+        index.update_page("index.html", {"links": ["/", "https://boot.dev"], "images": ["/a.png"]})
+        index.update_page("other.html", {"links": ["/"], "images": []})
+        self.assertEqual(index.refresh(), [])
+        index.urls = {"/a.png": "/a.9876543210.png"}
+        self.assertEqual(index.refresh(), ["/"])
+        self.assertFalse(index.has_page("index.html"))
+        self.assertTrue(index.has_page("other.html"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import io
+import tempfile
+import unittest
+
+import highlight
+from highlight import code_language, highlight_code, register_language
+from minify import MinifyingWriter
+from parse import configure, generator_version, markdown_to_html_node
+
+class TestHighlight(unittest.TestCase):
+    def tearDown(self):
+        configure(block_cache_bytes=0, cache_dir=None)
+
+    def test_code_language(self):
+        self.assertEqual(code_language("Python"), "python")
+        self.assertEqual(code_language(" js title=a.js"), "js")
+        self.assertEqual(code_language(""), None)
+        self.assertEqual(code_language("print(1)"), None)
+        self.assertEqual(code_language("c++"), "c++")
+
+    def test_python(self):
+        html = highlight_code("def f(x):\n    return \"<a>\" # done\n", "py")
+        self.assertEqual(html, (
+            "<span class=\"hl-keyword\">def</span> f(x):\n"
+            "    <span class=\"hl-keyword\">return</span> <span class=\"hl-string\">\"&lt;a&gt;\"</span>"
+            " <span class=\"hl-comment\"># done</span>\n"
+        ))
+        # Keywords only match whole words; unterminated strings end with the line
+        self.assertEqual(highlight_code("ifx = 'a\n1", "python"), (
+            "ifx = <span class=\"hl-string\">'a</span>\n<span class=\"hl-number\">1</span>"
+        ))
+        self.assertEqual(highlight_code("x", "cobol"), None)
+
+    def test_register_language(self):
+        register_language(["test-lang"], [("keyword", r"\bgo\b")])
+        self.assertEqual(highlight_code("go to", "test-lang"), "<span class=\"hl-keyword\">go</span> to")
+        del highlight.LANGUAGES["test-lang"]
+
+    def test_versions_follow_the_rules(self):
+        version = generator_version()
+        md = "```test-lang\ngo\n```"
+        with tempfile.TemporaryDirectory() as tmp:
+            configure(block_cache_bytes=1024 * 1024, cache_dir=tmp)
+            self.assertNotIn("hl-keyword", markdown_to_html_node(md).to_html())
+            try:
+                register_language(["test-lang"], [("keyword", r"\bgo\b")])
+                self.assertNotEqual(generator_version(), version)
+                # A fresh process' view: the block cached without the language isn't used
+                configure(block_cache_bytes=1024 * 1024, cache_dir=tmp)
+                self.assertIn("<span class=\"hl-keyword\">go</span>", markdown_to_html_node(md).to_html())
+            finally:
+                del highlight.LANGUAGES["test-lang"]
+        self.assertEqual(generator_version(), version)
+        highlight.HIGHLIGHT_VERSION += "-test"
+        try:
+            self.assertNotEqual(generator_version(), version)
+        finally:
+            highlight.HIGHLIGHT_VERSION = highlight.HIGHLIGHT_VERSION[:-len("-test")]
+
+    def test_code_blocks(self):
+        html = markdown_to_html_node("```python\nprint(1)\n```").to_html()
+        self.assertEqual(html, (
+            "<div><pre><code class=\"language-python\">\n"
+            "<span class=\"hl-builtin\">print</span>(<span class=\"hl-number\">1</span>)\n"
+            "</code></pre></div>"
+        ))
+        html = markdown_to_html_node("```cobol\nA < B\n```").to_html()
+        self.assertEqual(html, "<div><pre><code class=\"language-cobol\">\nA &lt; B\n</code></pre></div>")
+        # Code on the opening fence line isn't a language
+        html = markdown_to_html_node("```print(1)\n```").to_html()
+        self.assertEqual(html, "<div><pre><code>print(1)\n</code></pre></div>")
+        # No info string: unchanged
+        html = markdown_to_html_node("```\nprint(1)\n```").to_html()
+        self.assertEqual(html, "<div><pre><code>\nprint(1)\n</code></pre></div>")
+
+    def test_minify_keeps_code(self):
+        html = markdown_to_html_node("```python\nif  x:\n    y\n```").to_html()
+        out = io.StringIO()
+        MinifyingWriter(out).write(html)
+        self.assertEqual(out.getvalue(), html)
+
+    def test_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            configure(cache_dir=tmp)
+            html = highlight_code("x = 1", "python")
+            highlight.flush_cache()
+            # A fresh process' view: served from disk, not highlighted again
+            configure(cache_dir=None)
+            configure(cache_dir=tmp)
+            cache = highlight.HIGHLIGHT_CACHE
+            (key,) = [row[0] for row in cache.connect().execute("SELECT key FROM entries")]
+            self.assertTrue(key.startswith("python:"))
+            cache.put(key, "cached")
+            self.assertEqual(highlight_code("x = 1", "py"), "cached")
+            self.assertNotEqual(highlight_code("x = 2", "py"), "cached")
+            self.assertEqual(html, "x = <span class=\"hl-number\">1</span>")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import struct
+import tempfile
+import unittest
+
+from images import ImageIndex, read_image_size
+from parse import configure, markdown_to_html_node
+
+def png(width, height):
+    return b"\x89PNG\r\n\x1a\n" + b"\x00\x00\x00\x0dIHDR" + struct.pack(">II", width, height) + b"\x08\x02\x00\x00\x00"
+
+def jpeg(width, height):
+    app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + b"\x00" * 9
+    sof = b"\xff\xc0" + struct.pack(">HBHH", 11, 8, height, width) + b"\x01\x01\x11\x00"
+    return b"\xff\xd8" + app0 + sof + b"\xff\xd9"
+
+class TestImages(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        os.makedirs(os.path.join(self.tmp.name, "images"))
+
+    def tearDown(self):
+        configure(image_root=None, images=None)
+        self.tmp.cleanup()
+
+    def write(self, name, data):
+        path = os.path.join(self.tmp.name, "images", name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_read_image_size(self):
+        self.assertEqual(read_image_size(self.write("a.png", png(640, 480))), (640, 480))
+        self.assertEqual(read_image_size(self.write("a.gif", b"GIF89a" + struct.pack("<HH", 32, 16))), (32, 16))
+        self.assertEqual(read_image_size(self.write("a.jpg", jpeg(1920, 1080))), (1920, 1080))
+        self.assertEqual(read_image_size(self.write("a.txt", b"not an image")), None)
+
+    def test_local_images_get_size_and_lazy_loading(self):
+        self.write("a.png", png(640, 480))
+        configure(image_root=self.tmp.name)
+        html = markdown_to_html_node("![a](/images/a.png) ![b](https://boot.dev/b.png)").to_html()
+        self.assertIn(
+            "<img alt=\"a\" src=\"/images/a.png\" width=\"640\" height=\"480\" loading=\"lazy\" decoding=\"async\">",
+            html,
+        )
+        self.assertIn("<img alt=\"b\" src=\"https://boot.dev/b.png\">", html)
+
+    def test_pages_measure_through_the_index(self):
+        self.write("a.png", png(640, 480))
+        index = ImageIndex(None, self.tmp.name, sizes={})
+        configure(image_root=self.tmp.name, images=index)
+        html = markdown_to_html_node("![a](/images/a.png)").to_html()
+        self.assertIn("width=\"640\" height=\"480\"", html)
+        self.assertEqual(list(index.images), ["/images/a.png"])
+        # Dimensions come from the store, keyed by content hash
+        index.sizes[index.images["/images/a.png"]["hash"]] = [1, 2]
+        html = markdown_to_html_node("![a](/images/a.png)").to_html()
+        self.assertIn("width=\"1\" height=\"2\"", html)
+
+    def test_index_refresh_and_report(self):
+        self.write("a.png", png(640, 480))
+        self.write("big.png", png(4000, 3000))
+        index = ImageIndex(os.path.join(self.tmp.name, "images.json"), self.tmp.name)
+        index.update_page("index.html", {"images": ["/images/a.png", "https://boot.dev/b.png"]})
+        index.update_page("big.html", {"images": ["/images/big.png"]})
+        self.assertEqual(index.pages["/"], ["/images/a.png"])
+        self.assertEqual(index.oversized(), [("/big.html", "/images/big.png", 29, [4000, 3000])])
+        self.assertEqual(index.refresh(), set())
+        os.utime(self.write("a.png", png(320, 240)), (1, 1)) # Same size; make sure the mtime moves
+        self.assertEqual(index.refresh(), {"/images/a.png"})
+        self.assertFalse(index.has_page("index.html"))
+        self.assertTrue(index.has_page("big.html"))
+
+if __name__ == "__main__":
+    unittest.main()
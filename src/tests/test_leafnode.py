@@ -12,3 +12,11 @@ class TestLeafNode(unittest.TestCase):
         p = LeafNode("p", "i am paragraph", { "style": "font-weight:bold;" })
         self.assertEqual(anchor.to_html(), "<a href=\"boot.dev\">i am link</a>")
         self.assertEqual(p.to_html(), "<p style=\"font-weight:bold;\">i am paragraph</p>")
+
+    def test_to_html_escapes(self):
+        anchor = LeafNode("a", "1 < 2 & \"3\"", { "href": "/q?a=1&b=\"2\"" })
+        self.assertEqual(
+            anchor.to_html(),
+            "<a href=\"/q?a=1&amp;b=&quot;2&quot;\">1 &lt; 2 &amp; \"3\"</a>",
+        )
+        self.assertEqual(LeafNode(None, "<b>").to_html(), "&lt;b&gt;")
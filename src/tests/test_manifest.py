@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+
+from manifest import MANIFEST_NAME, load_manifest
+from parse import SSBuildError, generate_pages_recursive
+
+TEMPLATE = "<title>{{ Title }}</title><body>{{ Content }}</body>"
+
+class TestManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.public = os.path.join(self.tmp.name, "public")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        os.makedirs(os.path.join(self.content, "post"))
+        self.write(self.template, TEMPLATE)
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        self.write(os.path.join(self.content, "post", "index.md"), "# Post")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def build(self):
+        generate_pages_recursive(self.content, self.public, self.template)
+        return os.path.getmtime(os.path.join(self.public, "index.html"))
+
+    def test_unchanged_pages_are_skipped(self):
+        first = self.build()
+        os.utime(os.path.join(self.public, "index.html"), (0, 0))
+        self.assertEqual(self.build(), 0)
+        self.assertNotEqual(first, 0)
+
+    def test_template_change_rebuilds(self):
+        self.build()
+        os.utime(os.path.join(self.public, "index.html"), (0, 0))
+        self.write(self.template, TEMPLATE + "<!-- v2 -->")
+        self.assertNotEqual(self.build(), 0)
+
+    def test_deleted_source_removes_output(self):
+        self.build()
+        os.remove(os.path.join(self.content, "post", "index.md"))
+        self.build()
+        self.assertFalse(os.path.exists(os.path.join(self.public, "post", "index.html")))
+        manifest = load_manifest(os.path.join(self.public, MANIFEST_NAME))
+        self.assertEqual(list(manifest.pages), ["index.md"])
+
+    def test_failed_page_is_reported_and_not_recorded(self):
+        self.write(os.path.join(self.content, "post", "index.md"), "# Post with *bad syntax")
+        with self.assertRaises(SSBuildError):
+            generate_pages_recursive(self.content, self.public, self.template, jobs=2)
+        self.assertTrue(os.path.exists(os.path.join(self.public, "index.html")))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "post", "index.html")))
+        manifest = load_manifest(os.path.join(self.public, MANIFEST_NAME))
+        self.assertEqual(list(manifest.pages), ["index.md"])
+
+if __name__ == "__main__":
+    unittest.main()
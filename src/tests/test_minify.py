@@ -0,0 +1,60 @@
+import io
+import unittest
+
+from minify import MinifyingWriter, minify_css, minify_html
+from parse import configure, markdown_to_html_node, render_page
+from template import Template
+
+class TestMinify(unittest.TestCase):
+    def tearDown(self):
+        configure(minify=False)
+
+    def test_minify_html(self):
+        html = "<html>\n  <body>\n    <!-- nav -->\n    <b>a</b>\n    <i>b</i>\n    <pre>x\n\n  y</pre>\n  </body>\n</html>"
+        self.assertEqual(minify_html(html), "<html><body><b>a</b>\n<i>b</i><pre>x\n\n  y</pre></body></html>")
+
+    def test_minifying_writer(self):
+        out = io.StringIO()
+        writer = MinifyingWriter(out)
+        for fragment in ["<p>a  b\n\n c </p>", "<pre><code>", "x\n\n  y", "</code></pre>", "<p>  d</p>"]:
+            writer.write(fragment)
+        self.assertEqual(out.getvalue(), "<p>a b\nc </p><pre><code>x\n\n  y</code></pre><p> d</p>")
+        self.assertEqual(writer.saved, 4)
+
+    def test_tags_are_kept(self):
+        # Attribute values keep their whitespace, even split across writes
+        out = io.StringIO()
+        writer = MinifyingWriter(out)
+        for fragment in ["<img alt=\"a  b\"", " title='x\n\n", "  y'>  text  ", "<a\n  href=\"/u\">", "<b>", "  c</b>"]:
+            writer.write(fragment)
+        self.assertEqual(out.getvalue(), "<img alt=\"a  b\" title='x\n\n  y'> text <a\n  href=\"/u\"><b> c</b>")
+        self.assertEqual(writer.saved, 3)
+
+    def test_unicode_spaces_are_text(self):
+        # Non-breaking spaces render; only ASCII whitespace collapses
+        self.assertEqual(minify_html("<p>10\xa0km,\xa0\xa0x</p>"), "<p>10\xa0km,\xa0\xa0x</p>")
+        out = io.StringIO()
+        writer = MinifyingWriter(out)
+        writer.write("<p>10\xa0km,\xa0\xa0x  é</p>")
+        self.assertEqual(out.getvalue(), "<p>10\xa0km,\xa0\xa0x é</p>")
+        self.assertEqual(writer.saved, 1)
+        self.assertEqual(minify_css(" a{font-family:x\xa0y}\n"), "a{font-family:x\xa0y}")
+
+    def test_minify_css(self):
+        css = "/* theme */\na :hover ,\nb > i {\n  color : red;\n  content: \"a ; b\";\n}\n"
+        self.assertEqual(minify_css(css), "a :hover,b>i{color :red;content:\"a ; b\"}")
+
+    def test_render_page(self):
+        configure(minify=True)
+        template = Template("<body>\n  <article>\n    {{ Content }}\n  </article>\n</body>", minify=True)
+        node = markdown_to_html_node("# Title\n\nsome   text\n\n```\ncode\n\n   kept\n```")
+        page = io.StringIO()
+        saved = render_page(page, template, "Title", node.write_html)
+        self.assertEqual(
+            page.getvalue(),
+            "<body><article><div><h1>Title</h1><p>some text</p><pre><code>\ncode\n\n   kept\n</code></pre></div></article></body>",
+        )
+        self.assertEqual(saved, template.saved + 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,4 @@
+import io
 import unittest
 
 from leafnode import LeafNode
@@ -51,3 +52,17 @@ class TestParentNode(unittest.TestCase):
         self.assertEqual(parent2.to_html(), expected_parent_2)
         self.assertEqual(parent3.to_html(), expected_parent_3)
 
+    def test_write_html(self):
+        parent = ParentNode(
+            "ul",
+            [
+                ParentNode("li", [LeafNode("b", "Bold text"), LeafNode(None, " item")]),
+                ParentNode("li", [LeafNode(None, "Normal text")]),
+            ],
+        )
+        expected = "<ul><li><b>Bold text</b> item</li><li>Normal text</li></ul>"
+        stream = io.StringIO()
+        parent.write_html(stream)
+        self.assertEqual(stream.getvalue(), expected)
+        self.assertEqual("".join(parent.iter_html()), expected)
+        self.assertEqual(parent.to_html(), expected)
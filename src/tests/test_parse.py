@@ -1,3 +1,5 @@
+import os
+import tempfile
 import unittest
 
 from parse import *
@@ -138,6 +140,14 @@ class TestParse(unittest.TestCase):
         ]
         result = text_to_textnodes(text)
         self.assertEqual(result, expected)
+        # Unclosed links stay text; a later complete one still matches
+        text = "[a](" * 3 + " then [b](/b)"
+        expected = [
+            TextNode("[a](" * 3 + " then ", TextType.TEXT),
+            TextNode("b", TextType.LINK, "/b"),
+        ]
+        self.assertEqual(text_to_textnodes(text), expected)
+        self.assertEqual(split_nodes_links([TextNode(text, TextType.TEXT)]), expected)
 
     def test_text_to_textnodes(self):
         text = "This is **text** with an *italic* word and a `code block` and an ![image](https://storage.googleapis.com/qvault-webapp-dynamic-assets/course_assets/zjjcJKZ.png) and a [link](https://boot.dev)"
@@ -156,6 +166,39 @@ class TestParse(unittest.TestCase):
         result = text_to_textnodes(text)
         self.assertEqual(result, expected)
 
+    def test_text_to_textnodes_literals(self):
+        # Delimiters inside code spans and stray brackets stay literal
+        text = "Run `a*b` then [see docs [here](/docs) and ![alt](/img.png)!"
+        expected = [
+            TextNode("Run ", TextType.TEXT),
+            TextNode("a*b", TextType.CODE),
+            TextNode(" then [see docs ", TextType.TEXT),
+            TextNode("here", TextType.LINK, "/docs"),
+            TextNode(" and ", TextType.TEXT),
+            TextNode("alt", TextType.IMAGE, "/img.png"),
+            TextNode("!", TextType.TEXT),
+        ]
+        result = text_to_textnodes(text)
+        self.assertEqual(result, expected)
+        self.assertEqual(text_to_textnodes(""), [TextNode("", TextType.TEXT)])
+
+    def test_markdown_to_document_title(self):
+        document = markdown_to_document("## Sub\n\n# The **Fellowship**\n\n# Second")
+        self.assertEqual(document.title, "The Fellowship")
+        self.assertEqual(extract_title(document.node.to_html()), "The <b>Fellowship</b>")
+        self.assertEqual(markdown_to_document("## Sub").title, None)
+
+    def test_generate_page_requires_title(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            from_path = os.path.join(tmp, "page.md")
+            template_path = os.path.join(tmp, "template.html")
+            with open(from_path, "w") as f:
+                f.write("## No title here")
+            with open(template_path, "w") as f:
+                f.write("{{ Title }}{{ Content }}")
+            with self.assertRaisesRegex(SSSyntaxError, "page.md"):
+                generate_page(from_path, os.path.join(tmp, "out", "page.md"), template_path)
+
     def test_markdown_to_blocks(self):
         expected = [
             "# This is a heading",
@@ -167,6 +210,8 @@ class TestParse(unittest.TestCase):
         self.assertEqual(result, expected)
 
     def test_block_to_block_type(self):
+        self.assertEqual(block_to_block_type(""), BlockType.PARAGRAPH)
+        self.assertEqual(block_to_block_type("\n> not a quote"), BlockType.PARAGRAPH)
         expected = BlockType.HEADING
         for text in ["# H1", "## H2", "### H3", "#### H4", "##### H5", "###### H6"]:
             result = block_to_block_type(text)
@@ -211,5 +256,66 @@ class TestParse(unittest.TestCase):
         result = block_to_block_type(text)
         self.assertEqual(result, expected)
 
+    def test_lex_blocks(self):
+        lines = ["# Title\n", "\n", "> quote 1\n", "> quote 2\n", "\n", "\n", "- li 1\n", "text"]
+        expected = [
+            Block(BlockType.HEADING, ["# Title"]),
+            Block(BlockType.QUOTE, ["> quote 1", "> quote 2"]),
+            Block(BlockType.PARAGRAPH, ["- li 1", "text"]),
+        ]
+        self.assertEqual(list(lex_blocks(lines)), expected)
+
+    def test_lex_blocks_fenced_code(self):
+        md = "# Title\n\n```\nline 1\n\n\nline 2\n```\n\ntext"
+        expected = [
+            Block(BlockType.HEADING, ["# Title"]),
+            Block(BlockType.CODE, ["```", "line 1", "", "", "line 2", "```"]),
+            Block(BlockType.PARAGRAPH, ["text"]),
+        ]
+        self.assertEqual(list(lex_blocks(md)), expected)
+        self.assertEqual(list(lex_blocks(md.splitlines(keepends=True))), expected)
+
+    def test_generate_page_streamed(self):
+        md = "Intro with [a link](/a)\n\n# Title\n\n```\ncode\n\nmore\n```\n\n![img](/b.png)"
+        with tempfile.TemporaryDirectory() as tmp:
+            from_path = os.path.join(tmp, "page.md")
+            template_path = os.path.join(tmp, "template.html")
+            with open(from_path, "w") as f:
+                f.write(md)
+            with open(template_path, "w") as f:
+                f.write("<title>{{ Title }}</title>{{ Content }}")
+            try:
+                configure(stream_bytes=0)
+                document = generate_page(from_path, os.path.join(tmp, "out", "page.md"), template_path)
+            finally:
+                configure(stream_bytes=STREAM_BYTES)
+            with open(os.path.join(tmp, "out", "page.html")) as f:
+                html = f.read()
+        whole = markdown_to_document(md)
+        self.assertEqual(html, f"<title>Title</title>{whole.node.to_html()}")
+        self.assertEqual((document.title, document.links, document.images), ("Title", ["/a"], ["/b.png"]))
+
+    def test_markdown_is_escaped(self):
+        html = markdown_to_html_node("# 1 < 2\n\nUse `<div>` & [a <b>](/x?a=1&b=2)\n\n- <li>").to_html()
+        self.assertEqual(
+            html,
+            "<div><h1>1 &lt; 2</h1><p>Use <code>&lt;div&gt;</code> &amp; "
+            "<a href=\"/x?a=1&amp;b=2\">a &lt;b&gt;</a></p><ul><li>&lt;li&gt;</li></ul></div>",
+        )
+
+    def test_empty_inline_content(self):
+        # Styled spans with nothing inside leave the block empty, not broken
+        self.assertEqual(markdown_to_html_node("# T\n\n``").to_html(), "<div><h1>T</h1><p></p></div>")
+        self.assertEqual(markdown_to_html_node("# T\n\n****").to_html(), "<div><h1>T</h1><p></p></div>")
+        self.assertEqual(markdown_to_html_node("> ``").to_html(), "<div><blockquote></blockquote></div>")
+        self.assertEqual(markdown_to_html_node("## ``").to_html(), "<div><h2></h2></div>")
+
+    def test_long_ordered_list(self):
+        block = "\n".join(f"{i}. li {i}" for i in range(1, 13))
+        self.assertEqual(block_to_block_type(block), BlockType.ORDERED_LIST)
+        html = markdown_to_html_node(block).to_html()
+        self.assertTrue(html.startswith("<div><ol><li>li 1</li>"))
+        self.assertTrue(html.endswith("<li>li 10</li><li>li 11</li><li>li 12</li></ol></div>"))
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,30 @@
+import unittest
+
+import profiler
+from parse import configure, markdown_to_document
+
+class TestProfiler(unittest.TestCase):
+    def tearDown(self):
+        configure(profile=False)
+        profiler.take_events()
+
+    def test_disabled_records_nothing(self):
+        configure(profile=False)
+        with profiler.span("page", "page", page="a.md"):
+            pass
+        self.assertEqual(profiler.take_events(), [])
+
+    def test_spans_and_summary(self):
+        configure(profile=True)
+        with profiler.span("page", "page", page="a.md"):
+            markdown_to_document("# Title\n\nSome *text*.")
+        events = profiler.take_events()
+        self.assertEqual([e["name"] for e in events], ["blocks", "inline", "page"])
+        self.assertTrue(all(e["ph"] == "X" and e["dur"] >= 0 for e in events))
+        summary = profiler.summarize(events, top=1)
+        self.assertIn("Slowest 1 of 1 pages:", summary)
+        self.assertIn("a.md", summary)
+        self.assertIn("inline (1x)", summary)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+import os
+import tempfile
+import unittest
+
+from references import ReferenceIndex, page_url, resolve_url
+
+class TestReferences(unittest.TestCase):
+    def test_page_url(self):
+        self.assertEqual(page_url("index.html"), "/")
+        self.assertEqual(page_url(os.path.join("majesty", "index.html")), "/majesty/")
+        self.assertEqual(page_url("about.html"), "/about.html")
+
+    def test_resolve_url(self):
+        self.assertEqual(resolve_url("/", "https://boot.dev"), None)
+        self.assertEqual(resolve_url("/", "#top"), None)
+        self.assertEqual(resolve_url("/blog/", "/images/a.png?v=1#x"), "/images/a.png")
+        self.assertEqual(resolve_url("/blog/post/", "../other/"), "/blog/other/")
+        self.assertEqual(resolve_url("/blog/", "img%20one.png"), "/blog/img one.png")
+
+    def test_index(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            os.makedirs(os.path.join(tmp, "images"))
+            open(os.path.join(tmp, "images", "a.png"), "w").close()
+            open(os.path.join(tmp, "index.html"), "w").close()
+            index = ReferenceIndex(os.path.join(tmp, "refs.json"))
+            index.update_page("index.html", {"links": ["/missing/", "https://boot.dev"], "images": ["/images/a.png"]})
+            index.update_page("other.html", {"links": ["/"], "images": ["/images/a.png"]})
+            self.assertEqual(index.pages_using("/images/a.png"), ["/", "/other.html"])
+            self.assertEqual(index.referenced_by()["/"], ["/other.html"])
+            self.assertEqual(index.broken(tmp), [("/", "/missing/")])
+            index.remove_page("index.html")
+            self.assertEqual(index.broken(tmp), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import math
+import time
+import unittest
+
+from highlight import highlight_code
+from parse import *
+from textnode import TextNode
+
+# Inputs are doubled DOUBLINGS times from a base size big enough that one
+# run takes MIN_SECONDS of CPU time. The slope of log(time) over log(size)
+# is ~1 for linear work and ~2 for quadratic; the bound leaves room for
+# timer noise and cache effects while still failing on a quadratic regression.
+DOUBLINGS = 3
+MIN_SECONDS = 0.01
+MAX_EXPONENT = 1.5
+REPEATS = 3
+
+def best_time(fn, arg):
+    best = None
+    for _ in range(REPEATS):
+        start = time.process_time()
+        fn(arg)
+        elapsed = time.process_time() - start
+        best = elapsed if best == None else min(best, elapsed)
+    return best
+
+def fitted_exponent(sizes, times):
+    # Least-squares slope of log(time) against log(size)
+    xs = [math.log(size) for size in sizes]
+    ys = [math.log(max(t, 1e-9)) for t in times]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    num = sum((x - mean_x) * (y - mean_y) for (x, y) in zip(xs, ys))
+    return num / sum((x - mean_x) ** 2 for x in xs)
+
+class TestScaling(unittest.TestCase):
+    def assertLinear(self, fn, make_input, n):
+        # n is a starting point; it doubles until a run is long enough to time
+        while best_time(fn, make_input(n)) < MIN_SECONDS:
+            n *= 2
+        sizes = [n * 2 ** i for i in range(DOUBLINGS + 1)]
+        times = [best_time(fn, make_input(size)) for size in sizes]
+        exponent = fitted_exponent(sizes, times)
+        self.assertLess(exponent, MAX_EXPONENT, f"time grew as size^{exponent:.2f} over sizes {sizes}")
+
+    def test_many_links(self):
+        self.assertLinear(text_to_textnodes, lambda n: "see [a](/b) and ![c](/d.png) " * n, 1000)
+
+    def test_unclosed_links(self):
+        self.assertLinear(text_to_textnodes, lambda n: "[a](" * n, 2000)
+        self.assertLinear(text_to_textnodes, lambda n: "![a](" * n, 2000)
+        self.assertLinear(extract_markdown_links, lambda n: "[a](" * n, 10000)
+        self.assertLinear(extract_markdown_images, lambda n: "![a](" * n, 10000)
+
+    def test_unmatched_brackets(self):
+        self.assertLinear(text_to_textnodes, lambda n: "[" * n + "](" * n, 2000)
+        self.assertLinear(extract_markdown_links, lambda n: "[" + "a" * n + "[](", 20000)
+
+    def test_split_nodes(self):
+        nodes = lambda n: [TextNode("x [a](/b) ![c](/d) " * n, TextType.TEXT)]
+        self.assertLinear(split_nodes_images, nodes, 1000)
+        self.assertLinear(split_nodes_links, nodes, 1000)
+
+    def test_star_runs(self):
+        self.assertLinear(text_to_textnodes, lambda n: "*" * (2 * n), 2000)
+        self.assertLinear(text_to_textnodes, lambda n: "**" + "[a](/b) *x* " * n + "**", 1000)
+
+    def test_long_paragraph(self):
+        line = lambda n: "word *it* **bold** `code` [link](/u) " * n
+        self.assertLinear(markdown_to_html_node, line, 500)
+
+    def test_many_blocks(self):
+        md = lambda n: "para *x*\n\n- a\n- b\n\n> quote\n> more\n\n```\ncode\n\nmore\n```\n\n" * n
+        self.assertLinear(markdown_to_html_node, md, 200)
+
+    def test_highlighting(self):
+        # Unterminated strings and comments of every kind
+        code = lambda n: "x = \"a ' b /* c `d ${e} # f\n" * n
+        for language in ("python", "javascript", "bash", "json", "css"):
+            self.assertLinear(lambda text: highlight_code(text, language), code, 500)
+        self.assertLinear(lambda text: highlight_code(text, "python"), lambda n: "'''\"\"\"" * n, 1000)
+
+    def test_many_text_nodes(self):
+        nodes = lambda n: [TextNode("word ", TextType.TEXT), TextNode("b", TextType.BOLD)] * n
+        self.assertLinear(text_nodes_to_value, nodes, 1000)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import json
+import os
+import tempfile
+import unittest
+
+import parse
+from parse import markdown_to_document
+from search import SearchIndex, load_search_index, search_terms, shard_name
+
+class TestSearch(unittest.TestCase):
+    def test_terms(self):
+        self.assertEqual(search_terms("The Lord of the *Rings*, a tale"), {"the", "lord", "of", "rings", "tale"})
+        self.assertEqual(shard_name("rings"), "ri")
+        self.assertEqual(shard_name("__init__"), "_")
+        md = "# Title\n\nSee [the shire](/shire/)\n\n- hobbits\n\n1. elves"
+        expected = {"title", "see", "the", "shire", "hobbits", "elves"}
+        self.assertEqual(markdown_to_document(md).terms(), expected)
+        # Split into terms in batches as the text comes in; same terms
+        batch = parse.TERMS_BATCH_CHARS
+        parse.TERMS_BATCH_CHARS = 8
+        try:
+            document = markdown_to_document(md)
+            self.assertLess(document.text_chars, 8)
+            self.assertEqual(document.terms(), expected)
+        finally:
+            parse.TERMS_BATCH_CHARS = batch
+
+    def test_incremental_index(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            index = SearchIndex(tmp)
+            index.update_page("index.html", {"title": "Home", "terms": ["rings", "shire"]})
+            index.update_page(os.path.join("post", "index.html"), {"title": "Post", "terms": ["rings"]})
+            index.save()
+            self.assertEqual(index.search("rings"), ["/", "/post/"])
+            shire_path = os.path.join(tmp, "search", "terms", "sh.json")
+            post_path = os.path.join(tmp, "search", "terms", "po.json")
+            os.utime(post_path, (1, 1))
+
+            index = load_search_index(tmp)
+            self.assertTrue(index.has_page("index.html"))
+            index.remove_page("index.html")
+            index.update_page("about.html", {"title": "About", "terms": ["mordor"]})
+            index.save()
+            self.assertEqual(index.search("rings"), ["/post/"])
+            self.assertFalse(os.path.exists(shire_path))
+            self.assertEqual(os.stat(post_path).st_mtime, 1) # Untouched shard
+            with open(os.path.join(tmp, "search", "pages.json")) as f:
+                # The removed page's id is reused
+                self.assertEqual(json.load(f)["pages"], [["About", "/about.html"], ["Post", "/post/"]])
+            with open(os.path.join(tmp, "search", "terms", "mo.json")) as f:
+                self.assertEqual(json.load(f), {"mordor": [0]})
+
+if __name__ == "__main__":
+    unittest.main()
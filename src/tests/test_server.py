@@ -0,0 +1,143 @@
+import http.client
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+# server.py lives next to src/, not in it
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+from server import CachingRequestHandler, FileCache, IMMUTABLE_CACHE_CONTROL, accepts_gzip, make_server
+
+class QuietHandler(CachingRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+class Stat:
+    def __init__(self, size, mtime_ns=1):
+        self.st_size = size
+        self.st_mtime_ns = mtime_ns
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.write("index.html", b"<p>home</p>")
+        self.write("index.html.gz", b"gzipped home")
+        st = os.stat(os.path.join(self.tmp.name, "index.html"))
+        os.utime(os.path.join(self.tmp.name, "index.html.gz"), ns=(st.st_atime_ns, st.st_mtime_ns))
+        self.write("page.html", b"<p>page</p>")
+        self.write("page.html.gz", b"stale page")
+        os.utime(os.path.join(self.tmp.name, "page.html.gz"), ns=(0, 0))
+        self.write("index.0123456789.css", b"body{}")
+        self.write("notes.0123456789.txt", b"not fingerprinted")
+        self.write(".asset-fingerprints.json", b'{"urls": {"/index.css": "/index.0123456789.css"}}')
+        self.httpd = make_server(handler_class=QuietHandler, port=0, directory=self.tmp.name, workers=1)
+        self.port = self.httpd.server_address[1]
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.tmp.cleanup()
+
+    def write(self, name, data):
+        with open(os.path.join(self.tmp.name, name), "wb") as f:
+            f.write(data)
+
+    def get(self, conn, path, headers={}):
+        conn.request("GET", path, headers=headers)
+        response = conn.getresponse()
+        return (response, response.read())
+
+    def test_accepts_gzip(self):
+        self.assertTrue(accepts_gzip("gzip, deflate"))
+        self.assertTrue(accepts_gzip("br;q=1.0, GZIP;q=0.5"))
+        self.assertTrue(accepts_gzip("*"))
+        self.assertFalse(accepts_gzip("gzip;q=0"))
+        self.assertFalse(accepts_gzip("gzip; q=0.000"))
+        self.assertFalse(accepts_gzip("deflate, br"))
+        self.assertFalse(accepts_gzip(None))
+
+    def test_file_cache(self):
+        cache = FileCache(max_bytes=10, max_file_bytes=6)
+        cache.put("a", Stat(4), b"aaaa")
+        self.assertEqual(cache.get("a", Stat(4)), b"aaaa")
+        # Changed on disk: dropped
+        self.assertEqual(cache.get("a", Stat(4, mtime_ns=2)), None)
+        self.assertEqual(cache.size, 0)
+        cache.put("a", Stat(4), b"aaaa")
+        cache.put("b", Stat(4), b"bbbb")
+        cache.get("a", Stat(4))
+        cache.put("c", Stat(4), b"cccc")
+        self.assertEqual(cache.get("b", Stat(4)), None)
+        self.assertEqual(cache.get("a", Stat(4)), b"aaaa")
+        self.assertFalse(cache.cacheable(Stat(7)))
+        cache.put("d", Stat(7), b"ddddddd")
+        self.assertEqual(cache.get("d", Stat(7)), None)
+
+    def test_gzip_negotiation(self):
+        conn = http.client.HTTPConnection("localhost", self.port)
+        (response, body) = self.get(conn, "/", {"Accept-Encoding": "gzip"})
+        self.assertEqual(body, b"gzipped home")
+        self.assertEqual(response.getheader("Content-Encoding"), "gzip")
+        self.assertEqual(response.getheader("Vary"), "Accept-Encoding")
+        (response, body) = self.get(conn, "/index.html")
+        self.assertEqual(body, b"<p>home</p>")
+        self.assertEqual(response.getheader("Content-Encoding"), None)
+        # A sidecar that doesn't carry its source's mtime is stale
+        (response, body) = self.get(conn, "/page.html", {"Accept-Encoding": "gzip"})
+        self.assertEqual(body, b"<p>page</p>")
+        self.assertEqual(response.getheader("Content-Encoding"), None)
+        conn.close()
+
+    def test_handler(self):
+        conn = http.client.HTTPConnection("localhost", self.port)
+        (response, body) = self.get(conn, "/page.html")
+        self.assertEqual((response.status, body), (200, b"<p>page</p>"))
+        self.assertEqual(response.getheader("Cache-Control"), None)
+        last_modified = response.getheader("Last-Modified")
+        (response, body) = self.get(conn, "/page.html", {"If-Modified-Since": last_modified})
+        self.assertEqual((response.status, body), (304, b""))
+        # Edits are served, not the cached copy
+        self.write("page.html", b"<p>edited</p>")
+        os.utime(os.path.join(self.tmp.name, "page.html"), ns=(0, 10**9))
+        (response, body) = self.get(conn, "/page.html")
+        self.assertEqual(body, b"<p>edited</p>")
+        (response, body) = self.get(conn, "/missing.html")
+        self.assertEqual(response.status, 404)
+        # The build's own indexes aren't served
+        for path in ("/.asset-fingerprints.json", "/%2Easset-fingerprints.json", "/a/../.asset-fingerprints.json"):
+            (response, body) = self.get(conn, path)
+            self.assertEqual(response.status, 404, path)
+        conn.close()
+
+    def test_immutable(self):
+        conn = http.client.HTTPConnection("localhost", self.port)
+        (response, body) = self.get(conn, "/index.0123456789.css")
+        self.assertEqual(body, b"body{}")
+        self.assertEqual(response.getheader("Cache-Control"), IMMUTABLE_CACHE_CONTROL)
+        # Only what the build fingerprinted, whatever the name looks like
+        (response, body) = self.get(conn, "/notes.0123456789.txt")
+        self.assertEqual(response.getheader("Cache-Control"), None)
+        # A new build's record is picked up
+        self.write(".asset-fingerprints.json", b'{"urls": {}}')
+        (response, body) = self.get(conn, "/index.0123456789.css")
+        self.assertEqual(response.getheader("Cache-Control"), None)
+        conn.close()
+
+    def test_idle_connections_hold_no_worker(self):
+        # One worker, kept by nobody while this connection sits idle
+        idle = http.client.HTTPConnection("localhost", self.port)
+        self.get(idle, "/page.html")
+        other = http.client.HTTPConnection("localhost", self.port, timeout=5)
+        (response, body) = self.get(other, "/index.html")
+        self.assertEqual(body, b"<p>home</p>")
+        # Both connections stay usable
+        (response, body) = self.get(idle, "/index.html")
+        self.assertEqual(body, b"<p>home</p>")
+        idle.close()
+        other.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,31 @@
+import io
+import os
+import tempfile
+import unittest
+
+from template import Template, load_template
+
+class TestTemplate(unittest.TestCase):
+    def test_render(self):
+        template = Template("<title>{{ Title }}</title><p>{{Content}}</p>{{ Date }}")
+        self.assertEqual(template.slots, {"Title", "Content", "Date"})
+        stream = io.StringIO()
+        template.render(stream, {"Title": "Home", "Content": lambda s: s.write("body")})
+        self.assertEqual(stream.getvalue(), "<title>Home</title><p>body</p>{{ Date }}")
+
+    def test_load_template_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "template.html")
+            with open(path, "w") as f:
+                f.write("{{ Title }}")
+            first = load_template(path)
+            self.assertIs(load_template(path), first)
+            with open(path, "w") as f:
+                f.write("<h1>{{ Title }}</h1>")
+            os.utime(path, ns=(0, 0))
+            second = load_template(path)
+            self.assertIsNot(second, first)
+            self.assertNotEqual(second.digest, first.digest)
+
+if __name__ == "__main__":
+    unittest.main()
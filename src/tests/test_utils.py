@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from utils import AtomicWriter, dir_sync
+
+class TestDirSync(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tmp.name, "static")
+        self.dst = os.path.join(self.tmp.name, "public")
+        os.makedirs(os.path.join(self.src, "images"))
+        self.write(os.path.join(self.src, "index.css"), "body {}")
+        self.write(os.path.join(self.src, "images", "a.png"), "png")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def read(self, path):
+        with open(path, "r") as f:
+            return f.read()
+
+    def test_sync_copies_only_changes(self):
+        self.assertEqual(dir_sync(self.src, self.dst), (2, 0))
+        self.assertEqual(self.read(os.path.join(self.dst, "images", "a.png")), "png")
+        self.assertEqual(dir_sync(self.src, self.dst), (0, 0))
+        self.write(os.path.join(self.src, "index.css"), "body { color: red; }")
+        self.assertEqual(dir_sync(self.src, self.dst), (1, 0))
+        self.assertEqual(self.read(os.path.join(self.dst, "index.css")), "body { color: red; }")
+
+    def test_sync_checksum_skips_touched_files(self):
+        dir_sync(self.src, self.dst)
+        os.utime(os.path.join(self.src, "index.css"), (1, 1))
+        self.assertEqual(dir_sync(self.src, self.dst, checksum=True), (0, 0))
+        self.assertEqual(os.stat(os.path.join(self.dst, "index.css")).st_mtime, 1)
+
+    def test_sync_removes_deleted_but_keeps_other_files(self):
+        dir_sync(self.src, self.dst, link=True)
+        self.write(os.path.join(self.dst, "index.html"), "<p>generated</p>")
+        os.remove(os.path.join(self.src, "images", "a.png"))
+        self.assertEqual(dir_sync(self.src, self.dst), (0, 1))
+        self.assertFalse(os.path.exists(os.path.join(self.dst, "images")))
+        self.assertTrue(os.path.exists(os.path.join(self.dst, "index.html")))
+
+    def test_sync_after_output_was_removed(self):
+        dir_sync(self.src, self.dst)
+        shutil.rmtree(self.dst)
+        self.assertEqual(dir_sync(self.src, self.dst), (2, 0))
+        self.assertEqual(self.read(os.path.join(self.dst, "images", "a.png")), "png")
+
+    def test_atomic_writer_skips_identical_output(self):
+        path = os.path.join(self.tmp.name, "page.html")
+        self.write(path, "<p>same</p>")
+        os.utime(path, (1, 1))
+        writer = AtomicWriter(path, skip_unchanged=True)
+        with writer as out:
+            out.write("<p>same</p>")
+        self.assertFalse(writer.written)
+        self.assertEqual(os.stat(path).st_mtime, 1)
+        writer = AtomicWriter(path, skip_unchanged=True)
+        with writer as out:
+            out.write("<p>changed</p>")
+        self.assertTrue(writer.written)
+        self.assertEqual(self.read(path), "<p>changed</p>")
+        self.assertEqual([f for f in os.listdir(self.tmp.name) if f.endswith(".tmp")], [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from parse import generate_pages_recursive
+from utils import SYNC_MANIFEST_NAME, dir_sync
+from watch import Watcher
+
+class TestWatcher(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.static = os.path.join(self.tmp.name, "static")
+        self.public = os.path.join(self.tmp.name, "public")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        os.makedirs(self.content)
+        os.makedirs(self.static)
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.static, "logo.png"), "png")
+        os.makedirs(os.path.join(self.content, "about"))
+        self.write(os.path.join(self.content, "about", "index.md"), "# About\n\n![logo](/logo.png)")
+        with contextlib.redirect_stdout(io.StringIO()):
+            dir_sync(self.static, self.public)
+            generate_pages_recursive(self.content, self.public, self.template)
+        self.watcher = Watcher(self.content, self.static, self.template, self.public)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def read(self, path):
+        with open(path, "r") as f:
+            return f.read()
+
+    def poll(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return self.watcher.poll()
+
+    def test_no_changes(self):
+        self.assertFalse(self.poll())
+
+    def test_page_edit_add_remove(self):
+        self.write(os.path.join(self.content, "index.md"), "# Home again")
+        os.makedirs(os.path.join(self.content, "post"))
+        self.write(os.path.join(self.content, "post", "index.md"), "# Post")
+        self.assertTrue(self.poll())
+        self.assertIn("Home again", self.read(os.path.join(self.public, "index.html")))
+        self.assertIn("Post", self.read(os.path.join(self.public, "post", "index.html")))
+        os.remove(os.path.join(self.content, "post", "index.md"))
+        self.assertTrue(self.poll())
+        self.assertFalse(os.path.exists(os.path.join(self.public, "post", "index.html")))
+
+    def test_asset_and_template_changes(self):
+        self.write(os.path.join(self.static, "index.css"), "body { color: red; }")
+        self.write(self.template, "<h2>{{ Title }}</h2>{{ Content }}")
+        self.assertTrue(self.poll())
+        self.assertEqual(self.read(os.path.join(self.public, "index.css")), "body { color: red; }")
+        self.assertTrue(self.read(os.path.join(self.public, "index.html")).startswith("<h2>Home</h2>"))
+
+    def test_asset_change_rebuilds_dependent_pages(self):
+        # Rebuilt pages with identical output keep their mtime, so check the log
+        self.write(os.path.join(self.static, "logo.png"), "new png")
+        log = io.StringIO()
+        with contextlib.redirect_stdout(log):
+            self.assertTrue(self.watcher.poll())
+        self.assertIn(os.path.join("about", "index.md"), log.getvalue())
+        self.assertNotIn(f"{os.path.join(self.content, 'index.md')} to", log.getvalue())
+
+    def test_asset_removal_is_flagged(self):
+        os.remove(os.path.join(self.static, "logo.png"))
+        log = io.StringIO()
+        with contextlib.redirect_stdout(log):
+            self.watcher.poll()
+        self.assertIn("Broken reference on /about/: /logo.png", log.getvalue())
+
+    def test_asset_sync_updates_static_manifest(self):
+        self.write(os.path.join(self.static, "new.txt"), "new")
+        self.assertTrue(self.poll())
+        self.assertIn("new.txt", self.read(os.path.join(self.public, SYNC_MANIFEST_NAME)))
+        # Removed from static/ while nobody watches: the next full sync cleans it up
+        os.remove(os.path.join(self.static, "new.txt"))
+        with contextlib.redirect_stdout(io.StringIO()):
+            dir_sync(self.static, self.public)
+        self.assertFalse(os.path.exists(os.path.join(self.public, "new.txt")))
+
+    def test_failed_poll_is_reported_and_retried(self):
+        os.makedirs(os.path.join(self.static, "fonts"))
+        self.write(os.path.join(self.static, "fonts", "a.woff"), "font")
+        self.write(os.path.join(self.public, "fonts"), "in the way")
+        log = io.StringIO()
+        with contextlib.redirect_stdout(log):
+            self.assertFalse(self.watcher.poll())
+        self.assertIn("Build failed", log.getvalue())
+        os.remove(os.path.join(self.public, "fonts"))
+        self.assertTrue(self.poll())
+        self.assertEqual(self.read(os.path.join(self.public, "fonts", "a.woff")), "font")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,7 @@
 class TextNode:
+    # Created once per inline span, so keep instances dict-free
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text, text_type, url = ""):
         self.text = text
         self.text_type = text_type
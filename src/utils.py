@@ -1,8 +1,193 @@
+import filecmp
+import json
 import os
 import shutil
+import tempfile
+
+from manifest import file_hash
+import minify
+import profiler
+
+SYNC_MANIFEST_NAME = ".static-manifest.json"
 
 def dir_copy(from_dir, to_dir):
     if os.path.exists(to_dir):
         shutil.rmtree(to_dir)
     shutil.copytree(from_dir, to_dir)
 
+
+def ensure_dir(dir_path):
+    # Not remembered between calls: the directory may have been removed since
+    # (by a clean, the watcher or another process)
+    if dir_path != "":
+        os.makedirs(dir_path, exist_ok=True)
+
+class AtomicWriter:
+    # Writes to a temp file next to path and renames it into place on success,
+    # so readers never see a half-written file and failures leave the old one.
+    # With skip_unchanged, identical output leaves the old file (and its mtime)
+    # alone; written tells the caller which happened.
+    def __init__(self, path, mode = "w", skip_unchanged = False):
+        self.path = path
+        self.mode = mode
+        self.skip_unchanged = skip_unchanged
+        self.file = None
+        self.tmp_path = None
+        self.written = False
+
+    def __enter__(self):
+        (fd, self.tmp_path) = tempfile.mkstemp(
+            dir=os.path.dirname(self.path) or ".",
+            prefix=f".{os.path.basename(self.path)}.",
+            suffix=".tmp",
+        )
+        self.file = os.fdopen(fd, self.mode)
+        return self.file
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.file.close()
+        if exc_type != None:
+            os.remove(self.tmp_path)
+            return False
+        if self.skip_unchanged and same_contents(self.tmp_path, self.path):
+            os.remove(self.tmp_path)
+            return False
+        os.chmod(self.tmp_path, 0o644)
+        os.replace(self.tmp_path, self.path)
+        self.written = True
+        return False
+
+def same_contents(path, other_path):
+    # Sizes first (filecmp does that from the stats), then the bytes
+    try:
+        return filecmp.cmp(path, other_path, shallow=False)
+    except FileNotFoundError:
+        return False
+
+def dir_sync(from_dir, to_dir, checksum = False, link = False, minify_css = False):
+    # Incremental dir_copy: copies only new or changed files and removes files
+    # that were synced before but are gone from from_dir. Anything else in
+    # to_dir (e.g. generated pages) is left alone. With minify_css, .css files
+    # are minified on the way; those are tracked by the manifest alone since
+    # their size no longer matches the source.
+    manifest_path = os.path.join(to_dir, SYNC_MANIFEST_NAME)
+    previous = load_json(manifest_path, {}).get("files", {})
+    synced = {}
+    copied = 0
+    for (rel, src) in walk_files(from_dir):
+        dst = os.path.join(to_dir, rel)
+        st = os.stat(src)
+        entry = {"size": st.st_size, "mtime": st.st_mtime_ns}
+        if minify_css and rel.endswith(".css"):
+            entry["minified"] = True
+            if previous.get(rel) == entry and os.path.isfile(dst):
+                synced[rel] = entry
+                continue
+        elif previous.get(rel, {}).get("minified") != True and not file_changed(src, dst, st, checksum):
+            synced[rel] = entry
+            continue
+        ensure_dir(os.path.dirname(dst))
+        with profiler.span("asset copy", file=rel):
+            if entry.get("minified"):
+                copy_minified_css(src, dst)
+            else:
+                copy_file(src, dst, link)
+        synced[rel] = entry
+        copied += 1
+
+    removed = 0
+    for rel in sorted(set(previous) - set(synced)):
+        dst = os.path.join(to_dir, rel)
+        if os.path.isfile(dst):
+            os.remove(dst)
+            removed += 1
+            remove_empty_dirs(os.path.dirname(dst), to_dir)
+
+    with AtomicWriter(manifest_path) as f:
+        json.dump({"files": synced}, f, indent=1, sort_keys=True)
+    print(f"Synced {from_dir}: {copied} copied, {removed} removed, {len(synced) - copied} unchanged.")
+    return (copied, removed)
+
+def walk_files(root):
+    # Yields (relative path, absolute path) for every file under root, sorted
+    for (dir_path, dir_names, file_names) in os.walk(root):
+        dir_names.sort()
+        for name in sorted(file_names):
+            path = os.path.join(dir_path, name)
+            yield (os.path.relpath(path, root), path)
+
+def file_changed(src, dst, src_stat, checksum = False):
+    try:
+        dst_stat = os.stat(dst)
+    except FileNotFoundError:
+        return True
+    if dst_stat.st_size != src_stat.st_size:
+        return True
+    if dst_stat.st_mtime_ns == src_stat.st_mtime_ns:
+        return False
+    if not checksum or file_hash(src) != file_hash(dst):
+        return True
+    # Same bytes, only the mtime moved; line it up so the next check is a stat
+    os.utime(dst, ns=(src_stat.st_atime_ns, src_stat.st_mtime_ns))
+    return False
+
+def copy_file(src, dst, link = False):
+    # Tries a hardlink (when asked), then copy_file_range, then a plain copy.
+    # Always lands atomically and keeps the source mtime for later comparisons.
+    if link:
+        tmp_path = f"{dst}.link.tmp"
+        try:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            os.link(src, tmp_path)
+            os.replace(tmp_path, dst)
+            return
+        except OSError:
+            pass # Cross-device or unsupported; fall back to copying
+    with open(src, "rb") as fsrc, AtomicWriter(dst, "wb") as fdst:
+        if not copy_range(fsrc, fdst, os.fstat(fsrc.fileno()).st_size):
+            shutil.copyfileobj(fsrc, fdst, 1 << 20)
+    shutil.copystat(src, dst)
+
+def copy_minified_css(src, dst):
+    with open(src, "r") as f:
+        css = f.read()
+    minified = minify.minify_css(css)
+    with AtomicWriter(dst) as out:
+        out.write(minified)
+    shutil.copystat(src, dst)
+    written = len(minified.encode("utf-8"))
+    minify.record_savings(".css", len(css.encode("utf-8")) - written, written)
+
+def copy_range(fsrc, fdst, size):
+    if not hasattr(os, "copy_file_range"):
+        return False
+    copied = 0
+    try:
+        while copied < size:
+            n = os.copy_file_range(fsrc.fileno(), fdst.fileno(), size - copied)
+            if n == 0:
+                break
+            copied += n
+    except OSError:
+        if copied > 0:
+            raise
+        return False
+    return copied == size
+
+def remove_empty_dirs(dir_path, stop_dir):
+    stop_dir = os.path.abspath(stop_dir)
+    dir_path = os.path.abspath(dir_path)
+    while dir_path != stop_dir and dir_path.startswith(stop_dir):
+        try:
+            os.rmdir(dir_path)
+        except OSError:
+            return # Not empty
+        dir_path = os.path.dirname(dir_path)
+
+def load_json(path, default):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
@@ -0,0 +1,127 @@
+import os
+import time
+
+from manifest import MANIFEST_NAME, load_manifest
+from parse import generate_changed_pages, generate_pages_recursive
+from references import REFERENCES_NAME, load_references, page_url
+from utils import dir_sync
+
+def scan(root, suffix = None):
+    # {path: (mtime_ns, size)} for every file under root, using scandir's cached stats
+    files = {}
+    if not os.path.isdir(root):
+        return files
+    stack = [root]
+    while len(stack) > 0:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    stack.append(entry.path)
+                elif entry.is_file() and (suffix == None or entry.name.endswith(suffix)):
+                    st = entry.stat()
+                    files[entry.path] = (st.st_mtime_ns, st.st_size)
+    return files
+
+def diff_scan(old, new):
+    changed = sorted(path for (path, sig) in new.items() if old.get(path) != sig)
+    removed = sorted(path for path in old if path not in new)
+    return (changed, removed)
+
+def file_signature(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+class Watcher:
+    # Polls content/, static/ and the template (stdlib only) and applies each
+    # change in-process: one page rebuild, one asset copy, or a full page
+    # rebuild when the template changes
+    def __init__(self, content_dir, static_dir, template_path, dest_dir, interval = 0.5, link = False, minify_css = False):
+        self.content_dir = content_dir
+        self.static_dir = static_dir
+        self.template_path = template_path
+        self.dest_dir = dest_dir
+        self.interval = interval
+        # dir_sync options, as the initial build used them
+        self.link = link
+        self.minify_css = minify_css
+        self.content = scan(content_dir, ".md")
+        self.static = scan(static_dir)
+        self.template = file_signature(template_path)
+
+    def __repr__(self):
+        return f"Watcher(content_dir={self.content_dir}, static_dir={self.static_dir}, template_path={self.template_path})"
+
+    def poll(self):
+        # Applies everything that changed since the last poll; returns True if anything did
+        # Errors are reported and the watch goes on
+        start = time.perf_counter()
+        try:
+            (assets_changed, dependents) = self.sync_static()
+            changes = assets_changed + self.rebuild_pages(dependents)
+        except Exception as e:
+            print(f"Build failed: {e}")
+            return False
+        if changes > 0:
+            print(f"Rebuilt {changes} change(s) in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return changes > 0
+
+    def sync_static(self):
+        # Syncs through dir_sync so .static-manifest.json and minified CSS stay
+        # as a full build leaves them. The scan is only kept once that worked,
+        # so a failed sync is retried on the next poll.
+        static = scan(self.static_dir)
+        (changed, removed) = diff_scan(self.static, static)
+        if len(changed) == 0 and len(removed) == 0:
+            return (0, [])
+        dir_sync(self.static_dir, self.dest_dir, link=self.link, minify_css=self.minify_css)
+        self.static = static
+        references = load_references(os.path.join(self.dest_dir, REFERENCES_NAME))
+        dependents = set()
+        for path in changed:
+            dependents.update(references.pages_using(self.asset_url(path)))
+        for path in removed:
+            for page in references.pages_using(self.asset_url(path)):
+                print(f"Broken reference on {page}: {self.asset_url(path)} was removed")
+        return (len(changed) + len(removed), self.page_sources(dependents))
+
+    def asset_url(self, path):
+        return "/" + os.path.relpath(path, self.static_dir).replace(os.sep, "/")
+
+    def page_sources(self, pages):
+        # Markdown paths for page URLs, via the build manifest
+        manifest = load_manifest(os.path.join(self.dest_dir, MANIFEST_NAME))
+        sources = []
+        for (source, entry) in manifest.pages.items():
+            if page_url(entry["output"]) in pages:
+                sources.append(os.path.join(self.content_dir, source))
+        return sources
+
+    def rebuild_pages(self, dependents = ()):
+        # dependents: pages to rebuild because an asset they reference changed
+        content = scan(self.content_dir, ".md")
+        template = file_signature(self.template_path)
+        if template != self.template:
+            # The template feeds every page
+            self.content = content
+            self.template = template
+            try:
+                generate_pages_recursive(self.content_dir, self.dest_dir, self.template_path)
+            except Exception as e:
+                print(f"Build failed: {e}")
+            return 1
+        (changed, removed) = diff_scan(self.content, content)
+        self.content = content
+        changed = sorted(set(changed).union(p for p in dependents if p in content))
+        if len(changed) == 0 and len(removed) == 0:
+            return 0
+        generate_changed_pages(self.content_dir, self.dest_dir, self.template_path, changed, removed)
+        return len(changed) + len(removed)
+
+    def run(self):
+        print(f"Watching {self.content_dir}, {self.static_dir} and {self.template_path} for changes...")
+        while True:
+            self.poll()
+            time.sleep(self.interval)